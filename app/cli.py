@@ -0,0 +1,68 @@
+"""Служебные команды.
+
+    python -m app.cli init-db        # таблицы и поисковый индекс (идемпотентно), перед SCHEMA_INIT_MODE=check/skip
+    python -m app.cli check-db       # код возврата 1, если каких-то таблиц, индексов или объектов поиска нет
+    python -m app.cli rebuild-stats
+    python -m app.cli archive-tasks  # один проход архивации, как у фоновой задачи
+    python -m app.cli worker         # отдельный воркер очереди заданий (в API тогда JOBS_WORKER_ENABLED=false)
+"""
+import argparse
+import asyncio
+import signal
+import sys
+from .config import settings
+from .database import AsyncSessionLocal, engine, init_models, missing_schema
+from .jobs import worker
+from .crud.stats import rebuild_task_stats
+from .maintenance import run_task_archive
+from .search import init_search_index
+
+async def init_db() -> None:
+    await init_models()
+    await init_search_index()
+    print("database schema is up to date")
+
+async def check_db() -> None:
+    missing = await missing_schema()
+    if missing:
+        print(f"missing schema objects: {', '.join(missing)}", file=sys.stderr)
+        raise SystemExit(1)
+    print("database schema is up to date")
+
+async def rebuild_stats() -> None:
+    await init_models()
+    async with AsyncSessionLocal() as session:
+        tasks = await rebuild_task_stats(session, yield_per=settings.EXPORT_YIELD_PER)
+    print(f"task stats rebuilt from {tasks} tasks")
+
+async def archive_tasks() -> None:
+    archived, purged = await run_task_archive()
+    print(f"archived {archived} completed tasks, purged {purged} deleted tasks")
+
+async def run_worker() -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    worker.start()
+    print(f"job worker started, concurrency {worker.concurrency}")
+    await stop.wait()
+    await worker.stop(timeout=settings.JOBS_SHUTDOWN_TIMEOUT_SECONDS)
+    await engine.dispose()
+
+COMMANDS = {
+    "init-db": init_db,
+    "check-db": check_db,
+    "rebuild-stats": rebuild_stats,
+    "archive-tasks": archive_tasks,
+    "worker": run_worker,
+}
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Task manager maintenance commands")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args(argv)
+    asyncio.run(COMMANDS[args.command]())
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field
+from typing import Literal
 
 class Settings(BaseSettings):
     # Database
@@ -7,6 +8,21 @@ class Settings(BaseSettings):
         default="postgresql+asyncpg://postgres:postgres@db:5432/postgres",
         description="SQLAlchemy async URL",
     )
+    # Реплики для чтения через запятую; пусто — все чтения идут в DATABASE_URL
+    DATABASE_READ_URLS: str = ""
+    DB_REPLICA_RETRY_SECONDS: float = 30.0
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # asyncpg: размер кэша prepared statements на соединение (0 — выключен, нужно за pgbouncer)
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # SQLite: применяются PRAGMA при каждом новом соединении
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
 
     # JWT
     JWT_SECRET_KEY: str = "change-me-access"
@@ -14,11 +30,111 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    # Обслуживание refresh_tokens: фоновая чистка и лимит живых токенов на пользователя
+    REFRESH_TOKEN_MAX_PER_USER: int = 20
+    REFRESH_TOKEN_PURGE_INTERVAL_SECONDS: float = 3600.0
+    REFRESH_TOKEN_PURGE_BATCH_SIZE: int = 1000
+    # Кэш проверенных access-токенов (0 — выключен)
+    JWT_DECODE_CACHE_SIZE: int = 10000
+
+    # Password hashing (bcrypt уходит в пул, чтобы не блокировать event loop)
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_EXECUTOR: Literal["thread", "process"] = "thread"
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_CONCURRENCY: int = 16
+
+    # Кэш пользователя для get_current_user (0 — выключен). TTL — сколько другие воркеры могут видеть
+    # устаревшего пользователя при EVENTS_BACKEND=memory; с postgres изменения рассылаются сразу
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: float = 60.0
 
     # App
+    # Схема при старте: create — create_all и поисковый индекс (dev), check — только проверить, что
+    # таблицы есть, skip — ничего. Для check/skip схему готовит python -m app.cli init-db
+    SCHEMA_INIT_MODE: Literal["create", "check", "skip"] = "create"
+
     APP_NAME: str = "Task Manager API"
     DEBUG: bool = False
 
+    # Лента изменений задач (SSE). postgres — LISTEN/NOTIFY для нескольких воркеров
+    EVENTS_BACKEND: Literal["memory", "postgres"] = "memory"
+    EVENTS_QUEUE_SIZE: int = 100
+    EVENTS_HISTORY_SIZE: int = 200
+    EVENTS_HISTORY_USERS: int = 10000
+    EVENTS_KEEPALIVE_SECONDS: float = 15.0
+
+    # Observability
+    METRICS_ENABLED: bool = True
+    # Запросы дольше порога пишутся в лог (0 — выключено)
+    SLOW_REQUEST_THRESHOLD_MS: float = 500.0
+
+    # Pagination
+    TASKS_PAGE_DEFAULT_LIMIT: int = 100
+    TASKS_PAGE_MAX_LIMIT: int = 1000
+
+    # Search
+    SEARCH_MAX_OFFSET: int = 10000
+
+    # Export
+    EXPORT_YIELD_PER: int = 1000
+
+    # Bulk
+    TASKS_BULK_MAX_ITEMS: int = 5000
+
+    # Rate limiting: token bucket на пользователя (по access-токену) или IP, "запросов/секунд".
+    # Ключ — "МЕТОД /шаблон/{пути}" (или "* /путь"); срабатывает первое совпавшее правило,
+    # остальные запросы — под RATE_LIMIT_DEFAULT ("" — без лимита). В env — JSON.
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMITS: dict[str, str] = {
+        "POST /api/auth/login": "10/60",
+        "POST /api/auth/signup": "5/60",
+        "POST /api/auth/refresh": "30/60",
+        "GET /api/tasks/all": "60/60",
+        "GET /api/tasks/export": "5/60",
+        "GET /api/tasks/search": "120/60",
+    }
+    RATE_LIMIT_DEFAULT: str = "600/60"
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+
+    # Archive: выполненные задачи без изменений дольше TASK_ARCHIVE_AFTER_DAYS переносятся в tasks_archive
+    # (0 — не переносить); удалённые хранятся там TASK_ARCHIVE_DELETED_RETENTION_DAYS (0 — бессрочно)
+    TASK_ARCHIVE_AFTER_DAYS: int = 90
+    TASK_ARCHIVE_DELETED_RETENTION_DAYS: int = 30
+    TASK_ARCHIVE_INTERVAL_SECONDS: int = 3600
+    TASK_ARCHIVE_BATCH_SIZE: int = 500
+
+    # Jobs: очередь отложенной работы в таблице jobs. JOBS_WORKER_ENABLED — обрабатывать ли её в процессе
+    # приложения (иначе — отдельно, python -m app.cli worker)
+    JOBS_WORKER_ENABLED: bool = True
+    JOBS_CONCURRENCY: int = 4
+    JOBS_POLL_INTERVAL_SECONDS: float = 1.0
+    JOBS_MAX_ATTEMPTS: int = 5
+    # повтор через base * 2^(попытка-1) секунд (не больше max), с разбросом
+    JOBS_BACKOFF_BASE_SECONDS: float = 2.0
+    JOBS_BACKOFF_MAX_SECONDS: float = 300.0
+    JOBS_TIMEOUT_SECONDS: float = 60.0
+    # running-задание без завершения дольше этого (упавший воркер) снова берётся в работу
+    JOBS_LOCK_TIMEOUT_SECONDS: float = 300.0
+    # сколько при остановке ждать уже начатые задания, потом они прерываются и повторятся позже
+    JOBS_SHUTDOWN_TIMEOUT_SECONDS: float = 10.0
+
+    # Server (python -m app.serve)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    # 0 — по числу доступных процессу ядер
+    SERVER_WORKERS: int = 0
+    SERVER_BACKLOG: int = 2048
+    SERVER_KEEPALIVE_SECONDS: int = 5
+    # сколько ждать незавершённые запросы при остановке, потом они обрываются (SSE переподключится)
+    SERVER_GRACEFUL_SHUTDOWN_SECONDS: int = 30
+    SERVER_PROXY_HEADERS: bool = True
+    SERVER_FORWARDED_ALLOW_IPS: str = "127.0.0.1"
+    SERVER_ACCESS_LOG: bool = False
+
+    # Stats: глубина ряда «создано по дням»
+    TASK_STATS_DEFAULT_DAYS: int = 30
+    TASK_STATS_MAX_DAYS: int = 366
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,94 @@
+from collections.abc import Sequence
+from datetime import datetime, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.engine import Row
+from sqlalchemy import select, insert, delete
+from ..events import broker
+from ..models import Task, TaskArchive, ArchiveReason
+from ..schemas import TaskOut
+from .stats import StatsDelta, apply_stats_delta
+
+# Колонки, общие для tasks и tasks_archive; строка переносится между таблицами как есть, с тем же id
+ARCHIVE_COLUMNS = (
+    Task.id,
+    Task.title,
+    Task.description,
+    Task.is_completed,
+    Task.owner_id,
+    Task.created_at,
+    Task.updated_at,
+)
+ARCHIVE_FIELDS = tuple(c.key for c in ARCHIVE_COLUMNS)
+
+async def move_to_archive(session: AsyncSession, rows: Sequence[Row], reason: ArchiveReason) -> None:
+    """Вставляет в архив строки, уже удалённые из tasks (DELETE ... RETURNING ARCHIVE_COLUMNS)."""
+    if not rows:
+        return
+    now = datetime.now(timezone.utc)
+    await session.execute(
+        insert(TaskArchive),
+        [{**dict(zip(ARCHIVE_FIELDS, row)), "archived_at": now, "archive_reason": reason} for row in rows],
+    )
+
+async def archive_completed_tasks(session: AsyncSession, *, older_than: datetime, batch_size: int) -> int:
+    """Переносит выполненные задачи без изменений с older_than пачками по batch_size, коммит после каждой."""
+    archived = 0
+    while True:
+        stale = (Task.is_completed == True, Task.updated_at < older_than)  # noqa: E712
+        batch = select(Task.id).where(*stale).limit(batch_size)
+        # условие повторяется в DELETE: задача, изменённая после выборки пачки, остаётся на месте
+        res = await session.execute(
+            delete(Task)
+            .where(Task.id.in_(batch), *stale)
+            .returning(*ARCHIVE_COLUMNS)
+            .execution_options(synchronize_session=False)
+        )
+        rows = res.all()
+        await move_to_archive(session, rows, ArchiveReason.completed)
+        await broker.publish(session, [broker.build(row.owner_id, "task.archived", {"id": row.id}) for row in rows])
+        await session.commit()
+        archived += len(rows)
+        if len(rows) < batch_size:
+            return archived
+
+async def purge_deleted_tasks(session: AsyncSession, *, older_than: datetime, batch_size: int) -> int:
+    """Окончательно удаляет мягко удалённые задачи, пролежавшие в архиве с older_than."""
+    purged = 0
+    while True:
+        batch = (
+            select(TaskArchive.id)
+            .where(TaskArchive.archive_reason == ArchiveReason.deleted, TaskArchive.archived_at < older_than)
+            .limit(batch_size)
+        )
+        res = await session.execute(
+            delete(TaskArchive).where(TaskArchive.id.in_(batch)).execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        purged += res.rowcount
+        if res.rowcount < batch_size:
+            return purged
+
+async def restore_task(session: AsyncSession, task_id: int, *, owner_id: int | None) -> Task | None:
+    """Возвращает задачу из архива в tasks с тем же id; None, если в архиве её нет (или она чужая)."""
+    stmt = select(TaskArchive).where(TaskArchive.id == task_id)
+    if owner_id is not None:
+        stmt = stmt.where(TaskArchive.owner_id == owner_id)
+    archived = (await session.execute(stmt)).scalar_one_or_none()
+    if archived is None:
+        return None
+    task = Task(**{f: getattr(archived, f) for f in ARCHIVE_FIELDS})
+    # свежий updated_at: восстановленная задача не уедет обратно в архив при следующем проходе
+    task.updated_at = datetime.now(timezone.utc)
+    session.add(task)
+    await session.delete(archived)
+    await session.flush()
+    if archived.archive_reason == ArchiveReason.deleted:
+        delta = StatsDelta()
+        delta.created(task)
+        await apply_stats_delta(session, delta)
+    await broker.publish(
+        session, [broker.build(task.owner_id, "task.restored", TaskOut.model_validate(task).model_dump(mode="json"))]
+    )
+    await session.commit()
+    await session.refresh(task)
+    return task
@@ -0,0 +1,117 @@
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, func
+from ..database import dialect_insert
+from ..models import Task, TaskArchive, TaskCounter, TaskDailyCount, ArchiveReason
+
+# Пишутся только строки пользователей: общая строка "global" была бы одной блокировкой на все записи задач.
+# Глобальные цифры — сумма по пользователям при чтении (админский отчёт, цена — O(пользователей)).
+GLOBAL_SCOPE = "global"
+_USER_SCOPE_PREFIX = "user:"
+
+def user_scope(owner_id: int) -> str:
+    return f"{_USER_SCOPE_PREFIX}{owner_id}"
+
+def _scope_filter(column, scope: str):
+    return column.startswith(_USER_SCOPE_PREFIX) if scope == GLOBAL_SCOPE else column == scope
+
+class StatsDelta:
+    """Накопитель изменений счётчиков за одну операцию; пишется одним upsert на таблицу."""
+
+    def __init__(self):
+        self.counters: defaultdict[str, list[int]] = defaultdict(lambda: [0, 0])
+        self.daily: Counter[tuple[str, date]] = Counter()
+
+    def add(self, owner_id: int, *, total: int = 0, completed: int = 0, created_at: datetime | None = None) -> None:
+        scope = user_scope(owner_id)
+        counter = self.counters[scope]
+        counter[0] += total
+        counter[1] += completed
+        if created_at is not None:
+            self.daily[scope, created_at.date()] += total
+
+    def created(self, task: Task) -> None:
+        self.add(task.owner_id, total=1, completed=int(bool(task.is_completed)), created_at=task.created_at)
+
+    def deleted(self, owner_id: int, is_completed: bool, created_at: datetime) -> None:
+        self.add(owner_id, total=-1, completed=-int(bool(is_completed)), created_at=created_at)
+
+    def completed_changed(self, owner_id: int, was: bool, now: bool) -> None:
+        if bool(was) != bool(now):
+            self.add(owner_id, completed=1 if now else -1)
+
+async def apply_stats_delta(session: AsyncSession, delta: StatsDelta) -> None:
+    """Upsert с инкрементом: безопасен при параллельных транзакциях, коммит — за вызывающим.
+    Строки пишутся в порядке ключа: транзакции, задевшие несколько владельцев, блокируют их в одном
+    порядке и не ловят взаимную блокировку."""
+    insert = dialect_insert(session)
+    counters = [
+        {"scope": scope, "total": total, "completed": completed}
+        for scope, (total, completed) in sorted(delta.counters.items())
+        if total or completed
+    ]
+    if counters:
+        stmt = insert(TaskCounter.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["scope"],
+            set_={
+                "total": TaskCounter.__table__.c.total + stmt.excluded.total,
+                "completed": TaskCounter.__table__.c.completed + stmt.excluded.completed,
+            },
+        )
+        await session.execute(stmt, counters)
+    daily = [{"scope": scope, "day": day, "created": n} for (scope, day), n in sorted(delta.daily.items()) if n]
+    if daily:
+        stmt = insert(TaskDailyCount.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["scope", "day"],
+            set_={"created": TaskDailyCount.__table__.c.created + stmt.excluded.created},
+        )
+        await session.execute(stmt, daily)
+
+async def get_task_stats(session: AsyncSession, scope: str, *, days: int) -> dict:
+    res = await session.execute(
+        select(func.coalesce(func.sum(TaskCounter.total), 0), func.coalesce(func.sum(TaskCounter.completed), 0)).where(
+            _scope_filter(TaskCounter.scope, scope)
+        )
+    )
+    total, completed = res.one()
+    since = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+    created = func.sum(TaskDailyCount.created)
+    res = await session.execute(
+        select(TaskDailyCount.day, created)
+        .where(_scope_filter(TaskDailyCount.scope, scope), TaskDailyCount.day >= since)
+        .group_by(TaskDailyCount.day)
+        .having(created > 0)
+        .order_by(TaskDailyCount.day)
+    )
+    return {
+        "total": total,
+        "completed": completed,
+        "open": total - completed,
+        "created_per_day": [{"day": day, "created": created} for day, created in res.all()],
+    }
+
+async def rebuild_task_stats(session: AsyncSession, *, yield_per: int = 1000) -> int:
+    """Пересчитывает счётчики по tasks и архиву выполненных в одной транзакции; возвращает число задач.
+    Для бэкфиллов и после правок в обход crud — лучше в окно без записи."""
+    delta = StatsDelta()
+    tasks = 0
+    # архивация выполненных — деталь хранения, в статистике они остаются; мягко удалённые — нет
+    sources = (
+        select(Task.owner_id, Task.is_completed, Task.created_at),
+        select(TaskArchive.owner_id, TaskArchive.is_completed, TaskArchive.created_at).where(
+            TaskArchive.archive_reason == ArchiveReason.completed
+        ),
+    )
+    for stmt in sources:
+        result = await session.stream(stmt.execution_options(yield_per=yield_per))
+        async for owner_id, is_completed, created_at in result:
+            delta.add(owner_id, total=1, completed=int(bool(is_completed)), created_at=created_at)
+            tasks += 1
+    await session.execute(delete(TaskCounter))
+    await session.execute(delete(TaskDailyCount))
+    await apply_stats_delta(session, delta)
+    await session.commit()
+    return tasks
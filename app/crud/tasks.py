@@ -1,37 +1,324 @@
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime, timezone
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from ..models import Task
+from sqlalchemy.engine import Row
+from sqlalchemy import bindparam, select, insert, update, delete, func, and_, or_, cast, null, union_all, Select
+from ..events import broker
+from ..models import Task, TaskArchive, ArchiveReason
+from ..schemas import TaskListParams, TaskCreate, TaskBulkUpdateItem, TaskOut
+from ..pagination import encode_cursor, decode_cursor
+from .stats import StatsDelta, apply_stats_delta
+from .archive import ARCHIVE_COLUMNS, move_to_archive
+
+async def _publish(session: AsyncSession, kind: str, tasks: list[Task]) -> None:
+    """События уходят подписчикам только после commit этой сессии."""
+    await broker.publish(
+        session,
+        [broker.build(task.owner_id, kind, TaskOut.model_validate(task).model_dump(mode="json")) for task in tasks],
+    )
 
 async def create_task(session: AsyncSession, *, title: str, description: str | None, owner_id: int) -> Task:
     task = Task(title=title, description=description, owner_id=owner_id)
     session.add(task)
+    await session.flush()
+    delta = StatsDelta()
+    delta.created(task)
+    await apply_stats_delta(session, delta)
+    await _publish(session, "task.created", [task])
     await session.commit()
     await session.refresh(task)
     return task
 
+# Горячие запросы строятся один раз при импорте, на вызове подставляются только параметры
+_TASK_BY_ID = select(Task).where(Task.id == bindparam("task_id"))
+_TASK_LIST_VERSION = select(func.max(Task.updated_at), func.count(Task.id)).where(Task.owner_id == bindparam("owner_id"))
+_ARCHIVE_LIST_VERSION = select(func.max(TaskArchive.updated_at), func.count(TaskArchive.id)).where(
+    TaskArchive.owner_id == bindparam("owner_id"), TaskArchive.archive_reason == ArchiveReason.completed
+)
+
 async def get_task(session: AsyncSession, task_id: int) -> Task | None:
-    res = await session.execute(select(Task).where(Task.id == task_id))
+    res = await session.execute(_TASK_BY_ID, {"task_id": task_id})
     return res.scalar_one_or_none()
 
-async def list_tasks_by_owner(session: AsyncSession, owner_id: int) -> list[Task]:
-    res = await session.execute(select(Task).where(Task.owner_id == owner_id).order_by(Task.id))
-    return list(res.scalars().all())
+def _apply_list_params(stmt: Select, params: TaskListParams, t: type[Task] | type[TaskArchive] = Task) -> Select:
+    """Фильтры, keyset и limit+1; t — таблица (tasks или tasks_archive с теми же колонками)."""
+    if params.is_completed is not None:
+        stmt = stmt.where(t.is_completed == params.is_completed)
+    if params.created_after is not None:
+        stmt = stmt.where(t.created_at >= params.created_after)
+    if params.created_before is not None:
+        stmt = stmt.where(t.created_at < params.created_before)
+    if params.updated_after is not None:
+        stmt = stmt.where(t.updated_at >= params.updated_after)
+    if params.updated_before is not None:
+        stmt = stmt.where(t.updated_at < params.updated_before)
+
+    if params.sort == "updated_at":
+        if params.cursor:
+            last_id, last_updated_at = decode_cursor(params.cursor, params.sort)
+            stmt = stmt.where(
+                or_(
+                    t.updated_at > last_updated_at,
+                    and_(t.updated_at == last_updated_at, t.id > last_id),
+                )
+            )
+        stmt = stmt.order_by(t.updated_at, t.id)
+    else:
+        if params.cursor:
+            last_id, _ = decode_cursor(params.cursor, params.sort)
+            stmt = stmt.where(t.id > last_id)
+        stmt = stmt.order_by(t.id)
+    # +1 строка, чтобы узнать, есть ли следующая страница, без COUNT(*)
+    return stmt.limit(params.limit + 1)
+
+# Поля TaskOut: списки читаются кортежами, без ORM-объектов и identity map
+TASK_OUT_COLUMNS = (
+    Task.id,
+    Task.title,
+    Task.description,
+    Task.is_completed,
+    Task.owner_id,
+    Task.created_at,
+    Task.updated_at,
+)
+TASK_OUT_FIELDS = tuple(c.key for c in TASK_OUT_COLUMNS)
+_ARCHIVE_OUT_COLUMNS = tuple(getattr(TaskArchive, key) for key in TASK_OUT_FIELDS)
+_LIST_FIELDS = TASK_OUT_FIELDS + ("archived_at",)
+# archived_at у задач горячей таблицы. Типизированный NULL: в Postgres нетипизированный в подзапросе
+# станет text и не сойдётся в UNION с archived_at архива
+_NOT_ARCHIVED = cast(null(), TaskArchive.archived_at.type).label("archived_at")
+
+def _page(rows: Sequence[Row], params: TaskListParams) -> tuple[list[dict], str | None]:
+    next_cursor = None
+    if len(rows) > params.limit:
+        rows = rows[: params.limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(params.sort, last.id, last.updated_at)
+    return [dict(zip(_LIST_FIELDS, row)) for row in rows], next_cursor
+
+async def _list_tasks(session: AsyncSession, owner_id: int | None, params: TaskListParams) -> tuple[list[dict], str | None]:
+    # поля одни и те же в обеих ветках: archived_at в ответе есть всегда, у горячих задач — null
+    hot = select(*TASK_OUT_COLUMNS, _NOT_ARCHIVED)
+    if owner_id is not None:
+        hot = hot.where(Task.owner_id == owner_id)
+    if not params.include_archived:
+        # по умолчанию — только горячая таблица: цена запроса зависит от активных задач, а не от истории
+        res = await session.execute(_apply_list_params(hot, params))
+        return _page(res.all(), params)
+
+    # + выполненные задачи из архива (удалённые — нет): каждая ветка отдаёт свои limit+1, затем общий keyset
+    archived = select(*_ARCHIVE_OUT_COLUMNS, TaskArchive.archived_at).where(
+        TaskArchive.archive_reason == ArchiveReason.completed
+    )
+    if owner_id is not None:
+        archived = archived.where(TaskArchive.owner_id == owner_id)
+    branches = [_apply_list_params(hot, params), _apply_list_params(archived, params, TaskArchive)]
+    merged = union_all(*(select(b.subquery()) for b in branches)).subquery()
+    order = (merged.c.updated_at, merged.c.id) if params.sort == "updated_at" else (merged.c.id,)
+    res = await session.execute(select(merged).order_by(*order).limit(params.limit + 1))
+    return _page(res.all(), params)
+
+async def list_tasks_by_owner(session: AsyncSession, owner_id: int, params: TaskListParams) -> tuple[list[dict], str | None]:
+    """Одна страница задач владельца (dict с полями TaskOut) и курсор следующей (None, если страница последняя)."""
+    return await _list_tasks(session, owner_id, params)
+
+async def task_list_version(
+    session: AsyncSession, owner_id: int, *, include_archived: bool = False
+) -> tuple[datetime | None, int]:
+    """(max(updated_at), count) задач владельца — меняется при любом create/update/delete/архивации."""
+    res = await session.execute(_TASK_LIST_VERSION, {"owner_id": owner_id})
+    max_updated_at, count = res.one()
+    if include_archived:
+        res = await session.execute(_ARCHIVE_LIST_VERSION, {"owner_id": owner_id})
+        archived_max, archived_count = res.one()
+        max_updated_at = max(filter(None, (max_updated_at, archived_max)), default=None)
+        count += archived_count
+    return max_updated_at, count
+
+async def list_all_tasks(session: AsyncSession, params: TaskListParams) -> tuple[list[dict], str | None]:
+    return await _list_tasks(session, None, params)
+
+EXPORT_COLUMNS = (
+    Task.id,
+    Task.owner_id,
+    Task.title,
+    Task.description,
+    Task.is_completed,
+    Task.created_at,
+    Task.updated_at,
+    _NOT_ARCHIVED,
+)
+_ARCHIVE_EXPORT_COLUMNS = tuple(getattr(TaskArchive, c.key) for c in EXPORT_COLUMNS)
 
-async def list_all_tasks(session: AsyncSession) -> list[Task]:
-    res = await session.execute(select(Task).order_by(Task.id))
-    return list(res.scalars().all())
+async def stream_all_tasks(
+    session: AsyncSession,
+    *,
+    yield_per: int,
+    is_completed: bool | None = None,
+    updated_after: datetime | None = None,
+    include_archived: bool = False,
+) -> AsyncIterator[Sequence[Row]]:
+    """Отдаёт строки пачками по yield_per через серверный курсор, без ORM-объектов.
+    include_archived добавляет выполненные задачи из архива (удалённые — нет), общий порядок — по id."""
+    branches = [(select(*EXPORT_COLUMNS), Task)]
+    if include_archived:
+        archived = select(*_ARCHIVE_EXPORT_COLUMNS).where(TaskArchive.archive_reason == ArchiveReason.completed)
+        branches.append((archived, TaskArchive))
+    filtered = []
+    for stmt, t in branches:
+        if is_completed is not None:
+            stmt = stmt.where(t.is_completed == is_completed)
+        if updated_after is not None:
+            stmt = stmt.where(t.updated_at >= updated_after)
+        filtered.append(stmt)
+    if len(filtered) == 1:
+        stmt = filtered[0].order_by(Task.id)
+    else:
+        merged = union_all(*filtered).subquery()
+        stmt = select(merged).order_by(merged.c.id)
+    result = await session.stream(stmt.execution_options(yield_per=yield_per))
+    async for partition in result.partitions():
+        yield partition
 
-async def update_task(session: AsyncSession, task: Task, *, title: str | None = None, description: str | None = None, is_completed: bool | None = None) -> Task:
-    if title is not None:
-        task.title = title
-    if description is not None:
-        task.description = description
+async def update_task(
+    session: AsyncSession,
+    task: Task,
+    *,
+    title: str | None = None,
+    description: str | None = None,
+    is_completed: bool | None = None,
+    expected_updated_at: datetime | None = None,
+) -> Task | None:
+    """Обновляет задачу; None — если её успели удалить или, при expected_updated_at (If-Match),
+    изменить после чтения: условие проверяется в самом UPDATE, а не по прочитанной строке.
+    Статус меняется условным UPDATE: счётчик выполненных сдвигается, только если статус переключил
+    именно этот запрос, — две параллельные отметки «выполнено» не посчитаются дважды."""
+    changes = {k: v for k, v in (("title", title), ("description", description)) if v is not None}
+    stmt = update(Task).where(Task.id == task.id)
+    if expected_updated_at is not None:
+        stmt = stmt.where(Task.updated_at == expected_updated_at)
+    stmt = stmt.values(updated_at=datetime.now(timezone.utc), **changes).execution_options(synchronize_session=False)
+    delta = StatsDelta()
+    written = False
     if is_completed is not None:
-        task.is_completed = is_completed
+        res = await session.execute(stmt.where(Task.is_completed != is_completed).values(is_completed=is_completed))
+        if res.rowcount:
+            delta.completed_changed(task.owner_id, not is_completed, is_completed)
+            written = True  # changes записаны тем же UPDATE
+    if changes and not written:
+        res = await session.execute(stmt)
+        written = bool(res.rowcount)
+        if not written:
+            await session.rollback()
+            return None
+    res = await session.execute(_TASK_BY_ID.execution_options(populate_existing=True), {"task_id": task.id})
+    task = res.scalar_one_or_none()
+    # ничего не записали (статус уже такой): версия всё равно должна совпадать с If-Match
+    stale = not written and expected_updated_at is not None and task is not None and task.updated_at != expected_updated_at
+    if task is None or stale:
+        await session.rollback()
+        return None
+    await apply_stats_delta(session, delta)
+    await _publish(session, "task.updated", [task])
     await session.commit()
-    await session.refresh(task)
     return task
 
-async def delete_task(session: AsyncSession, task: Task) -> None:
-    await session.delete(task)
-    await session.commit()
\ No newline at end of file
+async def delete_task(session: AsyncSession, task: Task, *, expected_updated_at: datetime | None = None) -> bool:
+    """Мягкое удаление: задача уходит в архив и восстанавливается до очистки (TASK_ARCHIVE_DELETED_RETENTION_DAYS).
+    False — задачу уже удалили или, при expected_updated_at (If-Match), изменили после чтения."""
+    stmt = delete(Task).where(Task.id == task.id)
+    if expected_updated_at is not None:
+        stmt = stmt.where(Task.updated_at == expected_updated_at)
+    # архив и счётчики — по строке, которую удалил именно этот DELETE
+    res = await session.execute(stmt.returning(*ARCHIVE_COLUMNS).execution_options(synchronize_session=False))
+    row = res.one_or_none()
+    if row is None:
+        await session.rollback()
+        return False
+    await move_to_archive(session, [row], ArchiveReason.deleted)
+    delta = StatsDelta()
+    delta.deleted(row.owner_id, row.is_completed, row.created_at)
+    await apply_stats_delta(session, delta)
+    await broker.publish(session, [broker.build(row.owner_id, "task.deleted", {"id": row.id})])
+    await session.commit()
+    return True
+
+# Bulk: одна транзакция и фиксированное число запросов на пачку, владелец проверяется в SQL.
+# owner_id=None — без ограничения по владельцу (админ).
+
+async def bulk_create_tasks(session: AsyncSession, items: list[TaskCreate], *, owner_id: int) -> list[Task]:
+    rows = [
+        {
+            "title": item.title,
+            "description": item.description,
+            "is_completed": bool(item.is_completed),
+            "owner_id": owner_id,
+        }
+        for item in items
+    ]
+    res = await session.scalars(insert(Task).returning(Task, sort_by_parameter_order=True), rows)
+    tasks = list(res.all())
+    delta = StatsDelta()
+    for task in tasks:
+        delta.created(task)
+    await apply_stats_delta(session, delta)
+    await _publish(session, "task.created", tasks)
+    await session.commit()
+    return tasks
+
+async def bulk_update_tasks(session: AsyncSession, items: list[TaskBulkUpdateItem], *, owner_id: int | None) -> dict[int, Task]:
+    """Обновляет найденные задачи; возвращает {id: задача} только для тех, что реально обновлены."""
+    ids = {item.id for item in items}
+    stmt = select(Task.id).where(Task.id.in_(ids))
+    if owner_id is not None:
+        stmt = stmt.where(Task.owner_id == owner_id)
+    allowed = set((await session.scalars(stmt)).all())
+    if not allowed:
+        return {}
+
+    now = datetime.now(timezone.utc)
+    # статус — условными UPDATE, по одному на значение: счётчики сдвигаются только по строкам,
+    # которые переключил этот запрос (как в update_task), а не по прочитанному заранее состоянию
+    delta = StatsDelta()
+    for value in (True, False):
+        flip = {item.id for item in items if item.id in allowed and item.is_completed is value}
+        if not flip:
+            continue
+        res = await session.execute(
+            update(Task)
+            .where(Task.id.in_(flip), Task.is_completed != value)
+            .values(is_completed=value, updated_at=now)
+            .returning(Task.owner_id)
+            .execution_options(synchronize_session=False)
+        )
+        for task_owner_id in res.scalars().all():
+            delta.completed_changed(task_owner_id, not value, value)
+    params = [
+        {"id": item.id, "updated_at": now, **item.model_dump(exclude={"id", "is_completed"}, exclude_none=True)}
+        for item in items
+        if item.id in allowed
+    ]
+    await session.execute(update(Task), params)
+    res = await session.scalars(
+        select(Task).where(Task.id.in_(allowed)).execution_options(populate_existing=True)
+    )
+    tasks = {task.id: task for task in res.all()}
+    await apply_stats_delta(session, delta)
+    await _publish(session, "task.updated", list(tasks.values()))
+    await session.commit()
+    return tasks
+
+async def bulk_delete_tasks(session: AsyncSession, ids: list[int], *, owner_id: int | None) -> set[int]:
+    stmt = delete(Task).where(Task.id.in_(set(ids)))
+    if owner_id is not None:
+        stmt = stmt.where(Task.owner_id == owner_id)
+    res = await session.execute(stmt.returning(*ARCHIVE_COLUMNS).execution_options(synchronize_session=False))
+    rows = res.all()
+    await move_to_archive(session, rows, ArchiveReason.deleted)
+    delta = StatsDelta()
+    for row in rows:
+        delta.deleted(row.owner_id, row.is_completed, row.created_at)
+    await apply_stats_delta(session, delta)
+    await broker.publish(session, [broker.build(row.owner_id, "task.deleted", {"id": row.id}) for row in rows])
+    await session.commit()
+    return {row.id for row in rows}
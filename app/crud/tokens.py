@@ -0,0 +1,59 @@
+from datetime import datetime, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, or_
+from ..config import settings
+from ..jobs import enqueue, job_handler
+from ..models import RefreshToken
+from ..security import create_refresh_token
+
+ENFORCE_CAP_JOB = "refresh_tokens.enforce_cap"
+
+async def issue_refresh_token(session: AsyncSession, user_id: int) -> str:
+    """Добавляет refresh-токен в сессию (коммитит вызывающий); лимит живых токенов — отложенным заданием."""
+    token, jti, exp_dt = create_refresh_token(str(user_id))
+    session.add(RefreshToken(user_id=user_id, jti=jti, expires_at=exp_dt))
+    if settings.REFRESH_TOKEN_MAX_PER_USER > 0:
+        await enqueue(session, ENFORCE_CAP_JOB, {"user_id": user_id})
+    return token
+
+@job_handler(ENFORCE_CAP_JOB)
+async def enforce_refresh_token_cap(session: AsyncSession, payload: dict) -> None:
+    """Отзывает живые токены пользователя сверх REFRESH_TOKEN_MAX_PER_USER, начиная со старых. Идемпотентно."""
+    excess = (
+        select(RefreshToken.id)
+        .where(RefreshToken.user_id == payload["user_id"], RefreshToken.revoked == False)  # noqa: E712
+        .order_by(RefreshToken.id.desc())
+        .offset(settings.REFRESH_TOKEN_MAX_PER_USER)
+    )
+    await session.execute(
+        update(RefreshToken)
+        .where(RefreshToken.id.in_(excess))
+        .values(revoked=True)
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+
+async def revoke_user_tokens(session: AsyncSession, user_id: int) -> None:
+    await session.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.revoked == False)  # noqa: E712
+        .values(revoked=True)
+    )
+
+async def purge_refresh_tokens(session: AsyncSession, *, batch_size: int) -> int:
+    """Удаляет просроченные и отозванные токены пачками по batch_size, коммит после каждой пачки."""
+    purged = 0
+    while True:
+        now = datetime.now(timezone.utc)
+        batch = (
+            select(RefreshToken.id)
+            .where(or_(RefreshToken.expires_at <= now, RefreshToken.revoked == True))  # noqa: E712
+            .limit(batch_size)
+        )
+        res = await session.execute(
+            delete(RefreshToken).where(RefreshToken.id.in_(batch)).execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        purged += res.rowcount
+        if res.rowcount < batch_size:
+            return purged
@@ -1,14 +1,17 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import bindparam, select
 from ..models import User, Role
-from ..security import get_password_hash, verify_password
+from ..security import get_password_hash_async, verify_password_async
+
+_USER_BY_EMAIL = select(User).where(User.email == bindparam("email"))
 
 async def get_user_by_email(session: AsyncSession, email: str) -> User | None:
-    res = await session.execute(select(User).where(User.email == email))
+    res = await session.execute(_USER_BY_EMAIL, {"email": email})
     return res.scalar_one_or_none()
 
 async def create_user(session: AsyncSession, *, email: str, password: str, full_name: str | None = None, role: Role = Role.user) -> User:
-    user = User(email=email, hashed_password=get_password_hash(password), full_name=full_name, role=role)
+    hashed_password = await get_password_hash_async(password)
+    user = User(email=email, hashed_password=hashed_password, full_name=full_name, role=role)
     session.add(user)
     await session.commit()
     await session.refresh(user)
@@ -16,6 +19,12 @@ async def create_user(session: AsyncSession, *, email: str, password: str, full_
 
 async def authenticate(session: AsyncSession, *, email: str, password: str) -> User | None:
     user = await get_user_by_email(session, email)
-    if user and verify_password(password, user.hashed_password):
-        return user
-    return None
\ No newline at end of file
+    if not user:
+        return None
+    ok, new_hash = await verify_password_async(password, user.hashed_password)
+    if not ok:
+        return None
+    if new_hash:
+        # сменилась стоимость bcrypt: сохранится вместе с коммитом вызывающего (login)
+        user.hashed_password = new_hash
+    return user
\ No newline at end of file
@@ -1,17 +1,125 @@
+import time
+from sqlalchemy import event, exc, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from .config import settings
+from .metrics import instrument_engine
 
 class Base(DeclarativeBase):
     pass
 
-engine = create_async_engine(settings.DATABASE_URL, echo=settings.DEBUG, future=True)
+pool_stats = {
+    "checkouts": 0,
+    "timeouts": 0,
+    "wait_seconds_total": 0.0,
+    "wait_seconds_max": 0.0,
+}
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Очередь соединений с учётом времени ожидания checkout (включая открытие нового соединения)."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_stats["timeouts"] += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            pool_stats["checkouts"] += 1
+            pool_stats["wait_seconds_total"] += waited
+            pool_stats["wait_seconds_max"] = max(pool_stats["wait_seconds_max"], waited)
+
+def _engine_kwargs(url: str) -> dict:
+    u = make_url(url)
+    kwargs = {"echo": settings.DEBUG, "future": True}
+    if u.get_backend_name() == "sqlite" and u.database in (None, "", ":memory:"):
+        # in-memory база живёт в одном соединении (StaticPool), пул не настраиваем
+        return kwargs
+    kwargs.update(
+        poolclass=InstrumentedPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    if u.get_driver_name() == "asyncpg":
+        kwargs["connect_args"] = {"statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+    return kwargs
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.close()
+
+def make_engine(url: str):
+    new_engine = create_async_engine(url, **_engine_kwargs(url))
+    if new_engine.dialect.name == "sqlite":
+        event.listen(new_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    if settings.METRICS_ENABLED:
+        instrument_engine(new_engine)
+    return new_engine
+
+engine = make_engine(settings.DATABASE_URL)
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
+def get_pool_stats() -> dict:
+    pool = engine.pool
+    stats = dict(pool_stats, pool_class=type(pool).__name__)
+    for name in ("size", "checkedin", "checkedout"):
+        fn = getattr(pool, name, None)
+        if fn is not None:
+            stats[name] = fn()
+    if hasattr(pool, "overflow"):
+        # QueuePool.overflow() отсчитывается от -size: ниже ёмкости пула он отрицательный
+        stats["overflow"] = max(0, pool.overflow())
+        stats["connections_open"] = pool.size() + pool.overflow()
+    return stats
+
+def dialect_insert(session: AsyncSession):
+    """insert() с on_conflict_do_* для диалекта сессии (Postgres или SQLite)."""
+    return (postgresql if session.get_bind().dialect.name == "postgresql" else sqlite).insert
+
 async def get_async_session() -> AsyncSession:
     async with AsyncSessionLocal() as session:
         yield session
 
+def _create_missing_indexes(sync_conn) -> None:
+    # create_all пропускает существующую таблицу вместе с её индексами: индексы, добавленные в модели позже,
+    # создаём отдельно (CREATE INDEX на большой таблице в Postgres блокирует запись — init-db в окно обслуживания)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
 async def init_models():
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_create_missing_indexes)
+
+def _missing_schema(sync_conn) -> list[str]:
+    from .search import missing_search_index  # search импортирует engine отсюда
+
+    inspector = inspect(sync_conn)
+    existing = set(inspector.get_table_names())
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing:
+            missing.append(table.name)
+            continue
+        indexes = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        missing.extend(f"{table.name}.{ix.name}" for ix in table.indexes if ix.name not in indexes)
+    missing.extend(missing_search_index(sync_conn))
+    return missing
+
+async def missing_schema() -> list[str]:
+    """Таблицы ("tasks"), индексы ("tasks.ix_...") из моделей и объекты поискового индекса, которых нет в базе:
+    одна проверка вместо create_all на каждом старте."""
+    async with engine.connect() as conn:
+        return await conn.run_sync(_missing_schema)
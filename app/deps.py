@@ -1,18 +1,64 @@
-from fastapi import Depends, HTTPException, status
+from dataclasses import dataclass
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import bindparam, select, event
+from sqlalchemy.orm import object_session
 from typing import Annotated
+from .cache import TTLCache
+from .config import settings
 from .database import get_async_session
+from .events import broker
+from .replicas import get_read_session
 from .security import decode_access_token
 from .models import User, Role
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
 SessionDep = Annotated[AsyncSession, Depends(get_async_session)]
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_session)]
 TokenDep = Annotated[str, Depends(oauth2_scheme)]
 
-async def get_current_user(token: TokenDep, session: SessionDep) -> User:
+@dataclass(frozen=True, slots=True)
+class CurrentUser:
+    """Компактный принципал запроса: всё, что нужно для проверки доступа, без ORM-объекта."""
+    id: int
+    email: str
+    role: Role
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "CurrentUser":
+        return cls(id=user.id, email=user.email, role=user.role, is_active=user.is_active)
+
+# Изменение пользователя сбрасывает запись после commit во всех воркерах, если EVENTS_BACKEND=postgres (NOTIFY).
+# С memory-брокером — только в своём процессе: в остальных деактивированный или разжалованный пользователь
+# сохраняет доступ до USER_CACHE_TTL_SECONDS (python -m app.serve с несколькими воркерами его сокращает).
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+
+def _evict_cached_user(user_id: int | None) -> None:
+    if user_id is None:
+        user_cache.clear()
+    else:
+        user_cache.pop(user_id)
+
+broker.on_user_changed(_evict_cached_user)
+
+async def invalidate_cached_user(session: AsyncSession, user_id: int) -> None:
+    """Вызывать после изменений пользователя в обход ORM (bulk update, сырой SQL), до commit той же сессии."""
+    await session.run_sync(broker.user_changed, user_id)
+
+# ORM-изменения пользователя (роль, is_active, ...) сбрасывают кэш сами
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_on_change(mapper, connection, target: User) -> None:
+    broker.user_changed(object_session(target), target.id)
+
+# горячий запрос строится один раз: на каждом вызове только bind-параметр и готовый ключ кэша компиляции
+_USER_BY_ID = select(User).where(User.id == bindparam("user_id"))
+
+async def _resolve_user(token: str, session: AsyncSession) -> CurrentUser:
     try:
         payload = decode_access_token(token)
     except Exception:
@@ -25,13 +71,37 @@ async def get_current_user(token: TokenDep, session: SessionDep) -> User:
     if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
 
-    result = await session.execute(select(User).where(User.id == int(user_id)))
-    user = result.scalar_one_or_none()
-    if not user or not user.is_active:
+    principal = user_cache.get(int(user_id))
+    if principal is None:
+        result = await session.execute(_USER_BY_ID, {"user_id": int(user_id)})
+        user = result.scalar_one_or_none()
+        if user:
+            principal = CurrentUser.from_user(user)
+            user_cache.set(user.id, principal)
+    if not principal or not principal.is_active:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User inactive or not found")
-    return user
+    return principal
+
+# Пользователь читается из primary, а не из реплики: отстающая реплика вернула бы в кэш только что
+# заблокированного пользователя. Сессия открывает соединение лишь при промахе кэша.
+async def get_current_user(token: TokenDep, session: SessionDep) -> CurrentUser:
+    return await _resolve_user(token, session)
+
+async def get_stream_user(
+    session: SessionDep,
+    header_token: Annotated[str | None, Depends(oauth2_scheme_optional)],
+    access_token: Annotated[str | None, Query(description="For EventSource, which cannot send headers")] = None,
+) -> CurrentUser:
+    token = header_token or access_token
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await _resolve_user(token, session)
 
-async def get_current_admin(current_user: Annotated[User, Depends(get_current_user)]) -> User:
+async def get_current_admin(current_user: Annotated[CurrentUser, Depends(get_current_user)]) -> CurrentUser:
     if current_user.role != Role.admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required")
-    return current_user
\ No newline at end of file
+    return current_user
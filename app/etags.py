@@ -0,0 +1,29 @@
+import hashlib
+from datetime import datetime
+
+def _normalize(value) -> str:
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha1("|".join(_normalize(p) for p in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+def task_etag(task_id: int, updated_at: datetime) -> str:
+    return make_etag("task", task_id, updated_at)
+
+def _parse(header: str) -> list[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+def if_none_match(header: str | None, etag: str) -> bool:
+    """True, если клиентская копия актуальна (слабое сравнение, RFC 9110 13.1.2)."""
+    if not header:
+        return False
+    tags = _parse(header)
+    return "*" in tags or etag in (t.removeprefix("W/") for t in tags)
+
+def if_match_fails(header: str | None, etag: str) -> bool:
+    """True, если If-Match задан и не совпадает (сильное сравнение, RFC 9110 13.1.1)."""
+    if not header:
+        return False
+    tags = _parse(header)
+    return "*" not in tags and etag not in tags
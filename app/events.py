@@ -0,0 +1,292 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, suppress
+from collections.abc import AsyncIterator, Callable
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Лента изменений задач: события копятся в session.info и уходят подписчикам только после commit.
+
+class Subscription:
+    """Очередь одного подписчика. При переполнении теряются самые старые события,
+    а клиент получает "resync" — сигнал перечитать список целиком."""
+
+    def __init__(self, user_id: int, maxsize: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+        self.dropped = 0
+
+    def put(self, evt: dict) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            self.overflowed = True
+        self.queue.put_nowait(evt)
+
+    async def get(self) -> dict:
+        if self.overflowed:
+            self.overflowed = False
+            return {"id": None, "type": "resync"}
+        return await self.queue.get()
+
+class _History:
+    def __init__(self, maxlen: int):
+        self.events: deque[dict] = deque(maxlen=maxlen)
+        # id последнего вытесненного события: всё, что не новее, восстановить уже нельзя
+        self.trimmed = 0
+
+    def append(self, evt: dict) -> None:
+        if len(self.events) == self.events.maxlen:
+            self.trimmed = self.events[0]["id"]
+        self.events.append(evt)
+
+class InMemoryBroker:
+    """Fan-out внутри одного процесса; годится для одного воркера и для тестов."""
+
+    def __init__(self, *, queue_size: int, history_size: int, history_users: int):
+        self.queue_size = queue_size
+        self.history_size = history_size
+        self.history_users = history_users
+        self._subscribers: dict[int, set[Subscription]] = {}
+        self._history: OrderedDict[int, _History] = OrderedDict()
+        self._last_id = 0
+        # события до старта процесса и пользователей, вытесненных из истории, не восстановить
+        self._started_id = self.next_id()
+        self._evicted_upto = 0
+        self._user_listeners: list[Callable[[int], None]] = []
+        self.stats = {"published": 0, "delivered": 0, "dropped": 0}
+
+    def next_id(self) -> int:
+        # микросекунды с монотонной поправкой: id сравнимы между воркерами одного хоста
+        self._last_id = max(self._last_id + 1, time.time_ns() // 1000)
+        return self._last_id
+
+    def build(self, user_id: int, kind: str, task: dict) -> dict:
+        return {"id": self.next_id(), "type": kind, "user_id": user_id, "task": task}
+
+    async def publish(self, session: AsyncSession, events: list[dict]) -> None:
+        """Ставит события в очередь сессии; доставка — в after_commit."""
+        session.sync_session.info.setdefault("pending_task_events", []).extend(events)
+
+    def deliver(self, evt: dict) -> None:
+        user_id = evt["user_id"]
+        history = self._history.get(user_id)
+        if history is None:
+            history = self._history[user_id] = _History(self.history_size)
+            while len(self._history) > self.history_users:
+                _, evicted = self._history.popitem(last=False)
+                if evicted.events:
+                    self._evicted_upto = max(self._evicted_upto, evicted.events[-1]["id"])
+        else:
+            self._history.move_to_end(user_id)
+        history.append(evt)
+        self.stats["published"] += 1
+        for sub in self._subscribers.get(user_id, ()):
+            dropped = sub.dropped
+            sub.put(evt)
+            self.stats["delivered"] += 1
+            self.stats["dropped"] += sub.dropped - dropped
+
+    def _replay(self, user_id: int, last_event_id: int) -> list[dict] | None:
+        """События после last_event_id; None, если часть могла быть потеряна."""
+        history = self._history.get(user_id)
+        floor = history.trimmed if history is not None else self._evicted_upto
+        if last_event_id < max(self._started_id, floor):
+            return None
+        if history is None:
+            return []
+        return [evt for evt in history.events if evt["id"] > last_event_id]
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int, last_event_id: int | None = None) -> AsyncIterator[Subscription]:
+        sub = Subscription(user_id, self.queue_size)
+        if last_event_id is not None:
+            missed = self._replay(user_id, last_event_id)
+            if missed is None:
+                sub.overflowed = True
+            else:
+                for evt in missed:
+                    sub.put(evt)
+        self._subscribers.setdefault(user_id, set()).add(sub)
+        try:
+            yield sub
+        finally:
+            subs = self._subscribers.get(user_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[user_id]
+
+    def on_user_changed(self, listener: Callable[[int | None], None]) -> None:
+        """listener(user_id) — сбросить локальные кэши пользователя; None — всех (изменения могли потеряться)."""
+        self._user_listeners.append(listener)
+
+    def user_changed(self, session: Session, user_id: int) -> None:
+        """Пользователь изменён в транзакции session; кэши сбрасываются после её commit, здесь — только в этом процессе.
+        Сброс до commit не помогает: параллельный запрос успеет перечитать старую строку и закэшировать её."""
+        session.info.setdefault("changed_users", set()).add(user_id)
+
+    def evict_user(self, user_id: int | None) -> None:
+        for listener in self._user_listeners:
+            listener(user_id)
+
+    def subscriber_count(self) -> int:
+        return sum(len(s) for s in self._subscribers.values())
+
+    def resync_all(self) -> None:
+        """Часть событий могла потеряться: подписчики перечитывают списки, старые Last-Event-ID не восстановить."""
+        self._started_id = self.next_id()
+        for subs in self._subscribers.values():
+            for sub in subs:
+                sub.put({"id": None, "type": "resync"})
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+class PostgresBroker(InMemoryBroker):
+    """Для нескольких воркеров: события идут через LISTEN/NOTIFY, каждый воркер раздаёт их своим подписчикам.
+    NOTIFY транзакционный — уходит только при commit."""
+
+    CHANNEL = "task_events"
+    USERS_CHANNEL = "user_changes"
+    MAX_PAYLOAD = 7900  # лимит NOTIFY — 8000 байт
+    RECONNECT_MIN_SECONDS = 0.5
+    RECONNECT_MAX_SECONDS = 30.0
+
+    def __init__(self, dsn: str, **kwargs):
+        super().__init__(**kwargs)
+        self.dsn = dsn
+        self._conn = None
+        self._reconnect_task: asyncio.Task | None = None
+        self._stopping = False
+        self.stats.update(connected=False, disconnects=0, reconnects=0)
+
+    async def publish(self, session: AsyncSession, events: list[dict]) -> None:
+        for evt in events:
+            payload = json.dumps(evt, separators=(",", ":"))
+            if len(payload.encode()) > self.MAX_PAYLOAD:
+                # слишком большой снимок: отправляем без тела, клиент перечитает задачу
+                payload = json.dumps({**evt, "task": {"id": evt["task"]["id"]}}, separators=(",", ":"))
+            await session.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": self.CHANNEL, "payload": payload})
+
+    def user_changed(self, session: Session, user_id: int) -> None:
+        # свой процесс — в after_commit, остальные воркеры — по NOTIFY при commit этой транзакции
+        super().user_changed(session, user_id)
+        session.connection().execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": self.USERS_CHANNEL, "payload": str(user_id)})
+
+    def _on_user_notify(self, connection, pid, channel, payload) -> None:
+        self.evict_user(int(payload))
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        try:
+            evt = json.loads(payload)
+        except ValueError:
+            logger.warning("bad task event payload: %r", payload[:200])
+            return
+        self._last_id = max(self._last_id, evt["id"])
+        self.deliver(evt)
+
+    async def _connect(self) -> None:
+        import asyncpg
+
+        conn = await asyncpg.connect(self.dsn)
+        try:
+            await conn.add_listener(self.CHANNEL, self._on_notify)
+            await conn.add_listener(self.USERS_CHANNEL, self._on_user_notify)
+        except BaseException:
+            await conn.close()
+            raise
+        conn.add_termination_listener(self._on_terminated)
+        self._conn = conn
+        self.stats["connected"] = True
+
+    def _on_terminated(self, connection) -> None:
+        if connection is not self._conn or self._stopping:
+            return
+        # рестарт Postgres или обрыв сети: без переподключения воркер молча перестал бы получать события
+        logger.warning("LISTEN connection lost, reconnecting")
+        self._conn = None
+        self.stats["connected"] = False
+        self.stats["disconnects"] += 1
+        self._reconnect_task = asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        delay = self.RECONNECT_MIN_SECONDS
+        while not self._stopping:
+            try:
+                await self._connect()
+            except Exception as exc:
+                logger.warning("LISTEN reconnect failed (%s), retrying in %.1fs", exc, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.RECONNECT_MAX_SECONDS)
+                continue
+            self.stats["reconnects"] += 1
+            logger.info("LISTEN connection restored")
+            # пока соединения не было, NOTIFY терялись
+            self.resync_all()
+            self.evict_user(None)
+            return
+
+    async def start(self) -> None:
+        self._stopping = False
+        await self._connect()
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._reconnect_task
+            self._reconnect_task = None
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self.stats["connected"] = False
+            await conn.close()
+
+def _make_broker():
+    kwargs = dict(
+        queue_size=settings.EVENTS_QUEUE_SIZE,
+        history_size=settings.EVENTS_HISTORY_SIZE,
+        history_users=settings.EVENTS_HISTORY_USERS,
+    )
+    if settings.EVENTS_BACKEND == "postgres":
+        from sqlalchemy.engine import make_url
+
+        dsn = make_url(settings.DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+        return PostgresBroker(dsn, **kwargs)
+    return InMemoryBroker(**kwargs)
+
+broker = _make_broker()
+
+@event.listens_for(Session, "after_commit")
+def _deliver_pending(session: Session) -> None:
+    pending = session.info.pop("pending_task_events", None)
+    if pending and not isinstance(broker, PostgresBroker):
+        for evt in pending:
+            broker.deliver(evt)
+    for user_id in session.info.pop("changed_users", ()):
+        broker.evict_user(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session: Session) -> None:
+    session.info.pop("pending_task_events", None)
+    session.info.pop("changed_users", None)
+
+def format_sse(evt: dict) -> bytes:
+    lines = []
+    if evt.get("id") is not None:
+        lines.append(f"id: {evt['id']}")
+    lines.append(f"event: {evt['type']}")
+    lines.append("data: " + json.dumps(evt, separators=(",", ":"), default=str))
+    return ("\n".join(lines) + "\n\n").encode()
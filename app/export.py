@@ -0,0 +1,47 @@
+import csv
+import io
+import json
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime
+from sqlalchemy.engine import Row
+from .config import settings
+from .replicas import open_read_session
+from .crud.tasks import EXPORT_COLUMNS, stream_all_tasks
+
+EXPORT_FIELDS = [c.key for c in EXPORT_COLUMNS]
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+def _cell(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _ndjson_chunk(rows: Sequence[Row]) -> bytes:
+    lines = [json.dumps(dict(zip(EXPORT_FIELDS, map(_cell, row))), ensure_ascii=False) for row in rows]
+    return ("\n".join(lines) + "\n").encode()
+
+def _csv_chunk(rows: Sequence[Row], *, header: bool = False) -> bytes:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    writer.writerows([[_cell(v) for v in row] for row in rows])
+    return buf.getvalue().encode()
+
+async def iter_task_export(
+    fmt: str,
+    *,
+    is_completed: bool | None = None,
+    updated_after: datetime | None = None,
+    include_archived: bool = False,
+) -> AsyncIterator[bytes]:
+    # Своя сессия: зависимости с yield закрываются до того, как StreamingResponse начнёт отдавать тело
+    if fmt == "csv":
+        yield _csv_chunk([], header=True)
+    async with open_read_session() as session:
+        async for rows in stream_all_tasks(
+            session,
+            yield_per=settings.EXPORT_YIELD_PER,
+            is_completed=is_completed,
+            updated_after=updated_after,
+            include_archived=include_archived,
+        ):
+            yield _csv_chunk(rows) if fmt == "csv" else _ndjson_chunk(rows)
@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import random
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import event, select, update, delete, func, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from .config import settings
+from .database import AsyncSessionLocal
+from .models import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+# Очередь отложенной работы: задание пишется в той же транзакции, что и изменение, которое его породило,
+# и выполняется воркером после ответа клиенту. Обработчик должен быть идемпотентным — при сбое он повторяется.
+
+Handler = Callable[[AsyncSession, dict], Awaitable[None]]
+handlers: dict[str, Handler] = {}
+
+def job_handler(kind: str):
+    """Регистрирует обработчик: async def handler(session, payload); коммит — за обработчиком."""
+    def register(fn: Handler) -> Handler:
+        handlers[kind] = fn
+        return fn
+    return register
+
+def load_handlers() -> None:
+    # модули с @job_handler; импорт здесь, а не наверху — они сами импортируют enqueue
+    from .crud import tokens  # noqa: F401
+
+job_stats = {
+    "enqueued": 0,
+    "claimed": 0,
+    "completed": 0,
+    "retried": 0,
+    "dead": 0,
+    "lost": 0,  # закончились после того, как блокировку забрал другой воркер
+    "running": 0,
+}
+
+async def enqueue(
+    session: AsyncSession, kind: str, payload: dict, *, delay: float = 0, max_attempts: int | None = None
+) -> None:
+    """Ставит задание в сессию вызывающего: появится в очереди только вместе с его commit."""
+    session.add(
+        Job(
+            kind=kind,
+            payload=payload,
+            run_at=datetime.now(timezone.utc) + timedelta(seconds=delay),
+            max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        )
+    )
+    # считаются и будят воркер в after_commit: откаченные задания не в счёт
+    info = session.sync_session.info
+    info["jobs_enqueued"] = info.get("jobs_enqueued", 0) + 1
+
+def backoff_seconds(attempt: int) -> float:
+    delay = min(settings.JOBS_BACKOFF_MAX_SECONDS, settings.JOBS_BACKOFF_BASE_SECONDS * 2 ** (attempt - 1))
+    # разброс, чтобы упавшие разом задания не возвращались тоже разом
+    return delay * random.uniform(0.5, 1.0)
+
+async def claim_jobs(session: AsyncSession, limit: int) -> list[Job]:
+    """Забирает до limit готовых заданий. Postgres: FOR UPDATE SKIP LOCKED — воркеры не ждут друг друга
+    и не берут одно и то же. SQLite FOR UPDATE не поддерживает (SQLAlchemy его опускает), но UPDATE
+    под глобальной блокировкой записи и так атомарен."""
+    now = datetime.now(timezone.utc)
+    stale = and_(Job.status == JobStatus.running, Job.locked_at < now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT_SECONDS))
+    # задание, уронившее или подвесившее воркер, до _finish не доходит: после последней попытки — в dead, а не по кругу
+    res = await session.execute(
+        update(Job)
+        .where(stale, Job.attempts >= Job.max_attempts)
+        .values(status=JobStatus.dead, locked_at=None, last_error="lock timed out: worker lost the job on its last attempt")
+        .returning(Job.id, Job.kind, Job.attempts)
+        .execution_options(synchronize_session=False)
+    )
+    for job_id, kind, attempts in res.all():
+        job_stats["dead"] += 1
+        logger.error("job %s #%d is dead after %d attempts: lock timed out", kind, job_id, attempts)
+    ready = or_(and_(Job.status == JobStatus.queued, Job.run_at <= now), stale)
+    batch = select(Job.id).where(ready).order_by(Job.run_at, Job.id).limit(limit).with_for_update(skip_locked=True)
+    res = await session.execute(
+        update(Job)
+        .where(Job.id.in_(batch), ready)
+        .values(status=JobStatus.running, locked_at=now, attempts=Job.attempts + 1)
+        .returning(Job)
+        .execution_options(synchronize_session=False)
+    )
+    jobs = list(res.scalars().all())
+    await session.commit()
+    return jobs
+
+async def _finish(job: Job, error: str | None) -> None:
+    # только пока задание наше: после таймаута блокировки его мог забрать другой воркер
+    ours = (Job.id == job.id, Job.locked_at == job.locked_at)
+    async with AsyncSessionLocal() as session:
+        if error is None:
+            res = await session.execute(delete(Job).where(*ours))
+            outcome = "completed"
+        elif job.attempts >= job.max_attempts:
+            res = await session.execute(
+                update(Job).where(*ours).values(status=JobStatus.dead, locked_at=None, last_error=error)
+            )
+            outcome = "dead"
+        else:
+            retry_at = datetime.now(timezone.utc) + timedelta(seconds=backoff_seconds(job.attempts))
+            res = await session.execute(
+                update(Job).where(*ours).values(status=JobStatus.queued, locked_at=None, run_at=retry_at, last_error=error)
+            )
+            outcome = "retried"
+        await session.commit()
+    if not res.rowcount:
+        job_stats["lost"] += 1
+        logger.warning("job %s #%d was reclaimed by another worker before it finished", job.kind, job.id)
+        return
+    job_stats[outcome] += 1
+    if outcome == "dead":
+        logger.error("job %s #%d is dead after %d attempts: %s", job.kind, job.id, job.attempts, error)
+
+async def run_job(job: Job) -> None:
+    handler = handlers.get(job.kind)
+    error = None
+    if handler is None:
+        error = f"no handler for job kind {job.kind!r}"
+    else:
+        try:
+            async with AsyncSessionLocal() as session:
+                await asyncio.wait_for(handler(session, job.payload), timeout=settings.JOBS_TIMEOUT_SECONDS)
+        except asyncio.CancelledError:
+            # остановка воркера: задание останется running и будет подобрано после JOBS_LOCK_TIMEOUT_SECONDS
+            raise
+        except Exception as exc:
+            logger.warning("job %s #%d failed (attempt %d): %r", job.kind, job.id, job.attempts, exc)
+            error = repr(exc)[:2000]
+    await _finish(job, error)
+
+class JobWorker:
+    """Опрашивает очередь и выполняет до concurrency заданий одновременно.
+    Коммит с новыми заданиями в этом же процессе будит воркер сразу, без ожидания опроса."""
+
+    def __init__(self, *, concurrency: int, poll_interval: float):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._running: set[asyncio.Task] = set()
+        self._wakeup: asyncio.Event | None = None
+        self._loop_task: asyncio.Task | None = None
+
+    def wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _loop(self) -> None:
+        while True:
+            # сбрасываем до выборки: wake() во время неё не потеряется
+            self._wakeup.clear()
+            free = self.concurrency - len(self._running)
+            jobs = []
+            if free > 0:
+                try:
+                    async with AsyncSessionLocal() as session:
+                        jobs = await claim_jobs(session, free)
+                except Exception:
+                    logger.exception("claiming jobs failed")
+            job_stats["claimed"] += len(jobs)
+            for job in jobs:
+                task = asyncio.create_task(run_job(job))
+                self._running.add(task)
+                task.add_done_callback(self._done)
+            job_stats["running"] = len(self._running)
+            if len(jobs) == free and free > 0:
+                continue  # очередь не пуста — сразу за следующей пачкой
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _done(self, task: asyncio.Task) -> None:
+        self._running.discard(task)
+        job_stats["running"] = len(self._running)
+        self.wake()
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("job runner crashed", exc_info=task.exception())
+
+    def start(self) -> None:
+        load_handlers()
+        self._wakeup = asyncio.Event()
+        self._loop_task = asyncio.create_task(self._loop())
+
+    async def stop(self, timeout: float) -> None:
+        """Перестаёт брать новые задания и ждёт текущие не дольше timeout."""
+        if self._loop_task is None:
+            return
+        self._loop_task.cancel()
+        await asyncio.gather(self._loop_task, return_exceptions=True)
+        self._loop_task = None
+        if self._running:
+            _, pending = await asyncio.wait(set(self._running), timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        self._wakeup = None
+
+worker = JobWorker(concurrency=settings.JOBS_CONCURRENCY, poll_interval=settings.JOBS_POLL_INTERVAL_SECONDS)
+
+@event.listens_for(Session, "after_commit")
+def _wake_worker(session: Session) -> None:
+    enqueued = session.info.pop("jobs_enqueued", 0)
+    if enqueued:
+        job_stats["enqueued"] += enqueued
+        worker.wake()
+
+@event.listens_for(Session, "after_rollback")
+def _forget_enqueued(session: Session) -> None:
+    session.info.pop("jobs_enqueued", None)
+
+async def job_counts(session: AsyncSession) -> dict[str, int]:
+    res = await session.execute(select(Job.status, func.count(Job.id)).group_by(Job.status))
+    return {status.value: count for status, count in res.all()}
+
+async def list_dead_jobs(session: AsyncSession, *, limit: int) -> list[Job]:
+    res = await session.execute(select(Job).where(Job.status == JobStatus.dead).order_by(Job.id.desc()).limit(limit))
+    return list(res.scalars().all())
+
+async def retry_dead_job(session: AsyncSession, job_id: int) -> bool:
+    """Возвращает мёртвое задание в очередь с нуля попыток; False, если такого нет."""
+    res = await session.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status == JobStatus.dead)
+        .values(status=JobStatus.queued, attempts=0, run_at=datetime.now(timezone.utc))
+    )
+    await session.commit()
+    if not res.rowcount:
+        return False
+    worker.wake()
+    return True
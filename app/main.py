@@ -1,17 +1,79 @@
+import time
+# первым: от него отсчитывается время импорта остального приложения
+from .startup import started_at, startup_phase, startup_stats, mark_ready
+
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from fastapi.staticfiles import StaticFiles
 
 from .config import settings
-from .database import init_models
-from .routers import auth, tasks, users
+from . import metrics
+from .database import engine, init_models, missing_schema, get_pool_stats
+from .deps import user_cache
+from .events import broker
+from .jobs import worker as job_worker, job_stats
+from .maintenance import refresh_token_purge_loop, refresh_token_purge_stats, task_archive_loop, task_archive_stats
+from .ratelimit import RateLimitMiddleware, rate_limit_middleware_options, rate_limit_stats, rate_limit_store
+from .search import init_search_index
+from .replicas import ReadYourWritesMiddleware, read_replicas
+from .security import shutdown_hash_executor, hashing_stats, access_token_cache
+from .routers import auth, tasks, users, admin
+
+startup_stats["import_seconds"] = round(time.perf_counter() - started_at, 6)
+
+async def prepare_schema() -> None:
+    if settings.SCHEMA_INIT_MODE == "create":
+        # создаём таблицы, если их нет
+        with startup_phase("create_all"):
+            await init_models()
+        with startup_phase("search_index"):
+            await init_search_index()
+    elif settings.SCHEMA_INIT_MODE == "check":
+        with startup_phase("schema_check"):
+            missing = await missing_schema()
+        if missing:
+            raise RuntimeError(f"Database schema is missing {missing}; run `python -m app.cli init-db`")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await prepare_schema()
+    with startup_phase("broker"):
+        await broker.start()
+    mark_ready()
+    if settings.JOBS_WORKER_ENABLED:
+        job_worker.start()
+    background = []
+    if settings.REFRESH_TOKEN_PURGE_INTERVAL_SECONDS > 0:
+        background.append(asyncio.create_task(refresh_token_purge_loop()))
+    if settings.TASK_ARCHIVE_INTERVAL_SECONDS > 0:
+        background.append(asyncio.create_task(task_archive_loop()))
+    yield
+    for task in background:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await job_worker.stop(timeout=settings.JOBS_SHUTDOWN_TIMEOUT_SECONDS)
+    await broker.stop()
+    shutdown_hash_executor()
+    # соединения воркера закрываем явно, а не обрывом процесса
+    await engine.dispose()
+    for replica in read_replicas:
+        await replica.engine.dispose()
 
 app = FastAPI(
     title=settings.APP_NAME,
+    lifespan=lifespan,
     version="1.0.0",
     docs_url="/docs",
     openapi_url="/openapi.json",
 )
 
+# внутри CORS: ответы 429 тоже должны быть доступны браузеру
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware, **rate_limit_middleware_options())
 # Разрешаем запросы со всех источников (для dev)
 app.add_middleware(
     CORSMiddleware,
@@ -19,27 +81,48 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Next-Cursor",
+        "X-Next-Offset",
+        "ETag",
+        "Retry-After",
+        "X-RateLimit-Limit",
+        "X-RateLimit-Remaining",
+        "X-RateLimit-Reset",
+    ],
 )
-
-@app.on_event("startup")
-async def on_startup():
-    # создаём таблицы, если их нет
-    await init_models()
+if read_replicas:
+    app.add_middleware(ReadYourWritesMiddleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
 
 # Подключение роутеров
 app.include_router(auth.router)
 app.include_router(tasks.router)
 app.include_router(users.router)
+app.include_router(admin.router)
 
 # healthcheck
 @app.get("/", tags=["health"])
 async def root():
     return {"status": "ok", "app": settings.APP_NAME}
 
-# app/main.py
-from fastapi.staticfiles import StaticFiles  # NEW
-
-# ... существующий код выше
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics():
+        body = metrics.render(
+            metrics.stats_lines("db_pool", get_pool_stats()),
+            metrics.stats_lines("password_hashing", hashing_stats),
+            metrics.stats_lines("user_cache", user_cache.stats()),
+            metrics.stats_lines("access_token_cache", access_token_cache.stats()),
+            metrics.stats_lines("refresh_token_purge", refresh_token_purge_stats),
+            metrics.stats_lines("task_archive", task_archive_stats),
+            metrics.stats_lines("jobs", job_stats),
+            metrics.stats_lines("rate_limit", dict(rate_limit_stats, **rate_limit_store.stats())),
+            metrics.stats_lines("startup", startup_stats),
+            metrics.stats_lines("task_events", dict(broker.stats, subscribers=broker.subscriber_count())),
+        )
+        return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
 
 # смонтируем папку со статикой на /app
-app.mount("/app", StaticFiles(directory="app/static", html=True), name="app")  # NEW
\ No newline at end of file
+app.mount("/app", StaticFiles(directory="app/static", html=True), name="app")
\ No newline at end of file
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+from sqlalchemy import update, or_
+from .config import settings
+from .database import AsyncSessionLocal, dialect_insert
+from .models import Lease
+from .crud.archive import archive_completed_tasks, purge_deleted_tasks
+from .crud.tokens import purge_refresh_tokens
+
+logger = logging.getLogger(__name__)
+
+# Периодические задачи запускаются в lifespan каждого воркера, а проход делает только держатель аренды.
+# Срок — два интервала: держатель продлевает её на каждом проходе, упавшего сменят не позже чем через два.
+_LEASE_HOLDER = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+
+async def acquire_lease(name: str, ttl: float) -> bool:
+    """Берёт свободную или просроченную аренду либо продлевает свою; False — её держит другой процесс."""
+    now = datetime.now(timezone.utc)
+    values = {"holder": _LEASE_HOLDER, "expires_at": now + timedelta(seconds=ttl)}
+    async with AsyncSessionLocal() as session:
+        res = await session.execute(
+            update(Lease)
+            .where(Lease.name == name, or_(Lease.holder == _LEASE_HOLDER, Lease.expires_at < now))
+            .values(**values)
+        )
+        if not res.rowcount:
+            stmt = dialect_insert(session)(Lease).values(name=name, **values)
+            res = await session.execute(stmt.on_conflict_do_nothing(index_elements=["name"]))
+        await session.commit()
+    return res.rowcount > 0
+
+refresh_token_purge_stats = {
+    "runs": 0,
+    "skipped": 0,  # проход делал другой процесс
+    "failures": 0,
+    "purged_total": 0,
+    "last_purged": 0,
+    "last_run_at": None,
+    "last_duration_seconds": 0.0,
+}
+
+async def run_refresh_token_purge() -> int:
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as session:
+        purged = await purge_refresh_tokens(session, batch_size=settings.REFRESH_TOKEN_PURGE_BATCH_SIZE)
+    refresh_token_purge_stats["runs"] += 1
+    refresh_token_purge_stats["purged_total"] += purged
+    refresh_token_purge_stats["last_purged"] = purged
+    refresh_token_purge_stats["last_run_at"] = time.time()
+    refresh_token_purge_stats["last_duration_seconds"] = time.perf_counter() - started
+    return purged
+
+async def refresh_token_purge_loop() -> None:
+    """Фоновая задача из lifespan: периодически чистит refresh_tokens."""
+    interval = settings.REFRESH_TOKEN_PURGE_INTERVAL_SECONDS
+    while True:
+        try:
+            if await acquire_lease("refresh_token_purge", ttl=2 * interval):
+                purged = await run_refresh_token_purge()
+                if purged:
+                    logger.info("purged %d expired/revoked refresh tokens", purged)
+            else:
+                refresh_token_purge_stats["skipped"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            refresh_token_purge_stats["failures"] += 1
+            logger.exception("refresh token purge failed")
+        await asyncio.sleep(interval)
+
+task_archive_stats = {
+    "runs": 0,
+    "skipped": 0,
+    "failures": 0,
+    "archived_total": 0,
+    "purged_total": 0,
+    "last_archived": 0,
+    "last_purged": 0,
+    "last_run_at": None,
+    "last_duration_seconds": 0.0,
+}
+
+async def run_task_archive() -> tuple[int, int]:
+    """Один проход: перенос старых выполненных задач в архив и очистка давно удалённых."""
+    started = time.perf_counter()
+    now = datetime.now(timezone.utc)
+    archived = purged = 0
+    async with AsyncSessionLocal() as session:
+        if settings.TASK_ARCHIVE_AFTER_DAYS > 0:
+            archived = await archive_completed_tasks(
+                session,
+                older_than=now - timedelta(days=settings.TASK_ARCHIVE_AFTER_DAYS),
+                batch_size=settings.TASK_ARCHIVE_BATCH_SIZE,
+            )
+        if settings.TASK_ARCHIVE_DELETED_RETENTION_DAYS > 0:
+            purged = await purge_deleted_tasks(
+                session,
+                older_than=now - timedelta(days=settings.TASK_ARCHIVE_DELETED_RETENTION_DAYS),
+                batch_size=settings.TASK_ARCHIVE_BATCH_SIZE,
+            )
+    task_archive_stats["runs"] += 1
+    task_archive_stats["archived_total"] += archived
+    task_archive_stats["purged_total"] += purged
+    task_archive_stats["last_archived"] = archived
+    task_archive_stats["last_purged"] = purged
+    task_archive_stats["last_run_at"] = time.time()
+    task_archive_stats["last_duration_seconds"] = time.perf_counter() - started
+    return archived, purged
+
+async def task_archive_loop() -> None:
+    """Фоновая задача из lifespan: держит горячую таблицу tasks маленькой."""
+    interval = settings.TASK_ARCHIVE_INTERVAL_SECONDS
+    while True:
+        try:
+            if await acquire_lease("task_archive", ttl=2 * interval):
+                archived, purged = await run_task_archive()
+                if archived or purged:
+                    logger.info("archived %d completed tasks, purged %d deleted tasks", archived, purged)
+            else:
+                task_archive_stats["skipped"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            task_archive_stats["failures"] += 1
+            logger.exception("task archive run failed")
+        await asyncio.sleep(interval)
@@ -0,0 +1,188 @@
+import logging
+import math
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from .config import settings
+
+logger = logging.getLogger("app.requests")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    parts = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+def _number(value: float) -> str:
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in self.values.items():
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets) + (float("inf"),)
+        # labels -> [счётчики по бакетам (не накопительные), сумма, количество]
+        self.values: dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                entry[0][i] += 1
+                break
+        entry[1] += value
+        entry[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        for labels, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_labels(names, labels + (_number(float(bound)),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+REQUESTS = Counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served")
+DB_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements executed per request", ("method", "route"), QUERY_COUNT_BUCKETS
+)
+DB_TIME = Histogram("http_request_db_seconds", "Time spent in SQL per request", ("method", "route"))
+IN_FLIGHT.inc(amount=0)
+
+REGISTRY = (REQUESTS, LATENCY, IN_FLIGHT, DB_QUERIES, DB_TIME)
+
+# [число запросов, секунды] текущего HTTP-запроса; None вне запроса (фоновые задачи)
+_request_db: ContextVar[list | None] = ContextVar("request_db", default=None)
+
+# время старта — на контексте выполнения: он живёт одно выполнение, и упавший запрос ничего не оставляет на соединении
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+def _record(context) -> None:
+    started = getattr(context, "_query_started", None)
+    acc = _request_db.get()
+    if started is not None and acc is not None:
+        acc[0] += 1
+        acc[1] += time.perf_counter() - started
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record(context)
+
+def _handle_error(exception_context):
+    # упавший запрос (таймаут, нарушение ограничения) тоже считается и занимал время
+    if exception_context.execution_context is not None:
+        _record(exception_context.execution_context)
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", _handle_error)
+
+def stats_lines(prefix: str, stats: dict, labels: dict[str, str] | None = None) -> list[str]:
+    """Числовые поля dict-статистики как gauge-метрики prefix_<ключ>."""
+    names = tuple(labels) if labels else ()
+    values = tuple(labels.values()) if labels else ()
+    lines = []
+    for key, value in stats.items():
+        if isinstance(value, bool):
+            value = int(value)
+        if isinstance(value, (int, float)):
+            lines.append(f"# TYPE {prefix}_{key} gauge")
+            lines.append(f"{prefix}_{key}{_labels(names, values)} {_number(value)}")
+    return lines
+
+def render(*extra: list[str]) -> str:
+    lines: list[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    for chunk in extra:
+        lines.extend(chunk)
+    return "\n".join(lines) + "\n"
+
+class MetricsMiddleware:
+    """Латентность, статусы, in-flight и SQL на запрос; медленные запросы — в лог."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status_holder = [500]
+        streaming = [False]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+                # SSE живёт долго по определению, в slow-лог её не пишем
+                streaming[0] = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", ())
+                )
+            await send(message)
+
+        acc = [0, 0.0]
+        token = _request_db.set(acc)
+        IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_FLIGHT.dec()
+            _request_db.reset(token)
+            route = scope.get("route")
+            # шаблон пути, а не сам путь: /api/tasks/{task_id}, а не /api/tasks/42
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            REQUESTS.inc((method, route_path, status_holder[0]))
+            LATENCY.observe((method, route_path), elapsed)
+            DB_QUERIES.observe((method, route_path), acc[0])
+            DB_TIME.observe((method, route_path), acc[1])
+            if not streaming[0] and settings.SLOW_REQUEST_THRESHOLD_MS and elapsed * 1000 >= settings.SLOW_REQUEST_THRESHOLD_MS:
+                logger.warning(
+                    "slow request %s %s -> %s in %.1f ms (%d queries, %.1f ms in db)",
+                    method, scope["path"], status_holder[0], elapsed * 1000, acc[0], acc[1] * 1000,
+                )
@@ -1,10 +1,26 @@
 from __future__ import annotations
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import Integer, String, Text, Boolean, ForeignKey, DateTime, Enum, UniqueConstraint
-from datetime import datetime, timezone
+from sqlalchemy import text, Integer, String, Text, Boolean, ForeignKey, DateTime, Date, Enum, JSON, UniqueConstraint, Index
+from sqlalchemy.types import TypeDecorator
+from datetime import date, datetime, timezone
 import enum
 from .database import Base
 
+class UTCDateTime(TypeDecorator):
+    """Время всегда в UTC и всегда aware: SQLite, в отличие от Postgres, возвращает naive datetime."""
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
 class Role(str, enum.Enum):
     user = "user"
     admin = "admin"
@@ -18,9 +34,9 @@ class User(Base):
     hashed_password: Mapped[str] = mapped_column(String(255), nullable=False)
     role: Mapped[Role] = mapped_column(Enum(Role), default=Role.user, nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    created_at: Mapped[datetime] = mapped_column(UTCDateTime(), default=lambda: datetime.now(timezone.utc))
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),
+        UTCDateTime(),
         default=lambda: datetime.now(timezone.utc),
         onupdate=lambda: datetime.now(timezone.utc),
     )
@@ -29,28 +45,117 @@ class User(Base):
 
 class Task(Base):
     __tablename__ = "tasks"
+    # Под keyset-пагинацию: фильтр по владельцу/статусу + сортировка по id или (updated_at, id)
+    __table_args__ = (
+        Index("ix_tasks_owner_completed_id", "owner_id", "is_completed", "id"),
+        Index("ix_tasks_owner_updated_id", "owner_id", "updated_at", "id"),
+        Index("ix_tasks_updated_id", "updated_at", "id"),
+        # id не переиспользуются после переноса в архив (в Postgres это и так гарантирует sequence)
+        {"sqlite_autoincrement": True},
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     title: Mapped[str] = mapped_column(String(255), nullable=False)
     description: Mapped[str | None] = mapped_column(Text)
     is_completed: Mapped[bool] = mapped_column(Boolean, default=False)
     owner_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    created_at: Mapped[datetime] = mapped_column(UTCDateTime(), default=lambda: datetime.now(timezone.utc))
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),
+        UTCDateTime(),
         default=lambda: datetime.now(timezone.utc),
         onupdate=lambda: datetime.now(timezone.utc),
     )
 
     owner: Mapped["User"] = relationship("User", back_populates="tasks")
 
+class ArchiveReason(str, enum.Enum):
+    completed = "completed"  # выполнена давно, перенесена фоновой задачей
+    deleted = "deleted"  # удалена пользователем, можно восстановить до очистки
+
+class TaskArchive(Base):
+    """Задачи вне горячей таблицы: старые выполненные и мягко удалённые. id — тот же, что был в tasks."""
+    __tablename__ = "tasks_archive"
+    __table_args__ = (
+        Index("ix_tasks_archive_owner_reason_id", "owner_id", "archive_reason", "id"),
+        Index("ix_tasks_archive_reason_archived_at", "archive_reason", "archived_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    title: Mapped[str] = mapped_column(String(255), nullable=False)
+    description: Mapped[str | None] = mapped_column(Text)
+    is_completed: Mapped[bool] = mapped_column(Boolean, default=False)
+    owner_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(UTCDateTime(), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(UTCDateTime(), nullable=False)
+    archived_at: Mapped[datetime] = mapped_column(UTCDateTime(), nullable=False)
+    archive_reason: Mapped[ArchiveReason] = mapped_column(Enum(ArchiveReason), nullable=False)
+
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
-    __table_args__ = (UniqueConstraint("jti", name="uq_refresh_jti"),)
+    __table_args__ = (
+        UniqueConstraint("jti", name="uq_refresh_jti"),
+        # живые токены пользователя: logout и лимит на пользователя не трогают историю
+        Index(
+            "ix_refresh_tokens_user_live",
+            "user_id",
+            "id",
+            postgresql_where=text("revoked = false"),
+            sqlite_where=text("revoked = 0"),
+        ),
+        Index("ix_refresh_tokens_expires_at", "expires_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
     jti: Mapped[str] = mapped_column(String(64), nullable=False)
-    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(UTCDateTime(), nullable=False)
     revoked: Mapped[bool] = mapped_column(Boolean, default=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
\ No newline at end of file
+    created_at: Mapped[datetime] = mapped_column(UTCDateTime(), default=lambda: datetime.now(timezone.utc))
+
+# Счётчики задач для /api/tasks/stats, ведутся в той же транзакции, что и изменения задач.
+# scope: "user:<id>", глобальные цифры — сумма по ним; пересчёт с нуля — python -m app.cli rebuild-stats
+class TaskCounter(Base):
+    __tablename__ = "task_counters"
+
+    scope: Mapped[str] = mapped_column(String(32), primary_key=True)
+    total: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    completed: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+class TaskDailyCount(Base):
+    """Сколько из существующих задач создано в день (UTC)."""
+    __tablename__ = "task_daily_counts"
+    # глобальный отчёт суммирует всех пользователей за последние дни
+    __table_args__ = (Index("ix_task_daily_counts_day", "day"),)
+
+    scope: Mapped[str] = mapped_column(String(32), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    created: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+class JobStatus(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    dead = "dead"  # исчерпаны попытки, ждёт разбора (см. /api/admin/jobs)
+
+class Job(Base):
+    """Отложенная работа (app/jobs.py). Выполненные задания удаляются, в таблице только очередь и dead letters."""
+    __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_status_run_at", "status", "run_at"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    kind: Mapped[str] = mapped_column(String(64), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
+    status: Mapped[JobStatus] = mapped_column(Enum(JobStatus), default=JobStatus.queued, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False)
+    run_at: Mapped[datetime] = mapped_column(UTCDateTime(), default=lambda: datetime.now(timezone.utc), nullable=False)
+    locked_at: Mapped[datetime | None] = mapped_column(UTCDateTime())
+    last_error: Mapped[str | None] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(UTCDateTime(), default=lambda: datetime.now(timezone.utc))
+
+class Lease(Base):
+    """Аренда периодической задачи (app/maintenance.py): проход делает один процесс из всех воркеров и реплик."""
+    __tablename__ = "leases"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    holder: Mapped[str] = mapped_column(String(128), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(UTCDateTime(), nullable=False)
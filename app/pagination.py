@@ -0,0 +1,25 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any
+
+# Курсор непрозрачен для клиента: base64url(JSON) с ключом последней строки страницы.
+
+def encode_cursor(sort: str, last_id: int, last_updated_at: datetime | None = None) -> str:
+    data: dict[str, Any] = {"s": sort, "id": last_id}
+    if sort == "updated_at" and last_updated_at is not None:
+        data["u"] = last_updated_at.isoformat()
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def decode_cursor(cursor: str, sort: str) -> tuple[int, datetime | None]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if data.get("s") != sort:
+            raise ValueError("cursor was issued for a different sort order")
+        last_id = int(data["id"])
+        last_updated_at = datetime.fromisoformat(data["u"]) if sort == "updated_at" else None
+    except (ValueError, KeyError, TypeError, AttributeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    return last_id, last_updated_at
@@ -0,0 +1,170 @@
+import json
+import math
+import re
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from starlette.routing import compile_path
+from .config import settings
+from .security import decode_access_token
+
+@dataclass(frozen=True, slots=True)
+class Limit:
+    """Token bucket: до capacity запросов подряд, дальше — capacity за period секунд."""
+    capacity: int
+    period: float
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.period
+
+    @classmethod
+    def parse(cls, value: str) -> "Limit":
+        # "10/60" — 10 запросов за 60 секунд
+        capacity, _, period = value.partition("/")
+        limit = cls(int(capacity), float(period or 1))
+        if limit.capacity < 1 or limit.period <= 0:
+            raise ValueError(f"Invalid rate limit: {value!r}")
+        return limit
+
+@dataclass(frozen=True, slots=True)
+class Decision:
+    allowed: bool
+    remaining: int
+    retry_after: float  # через сколько появится токен (0, если пропущен)
+    reset_after: float  # через сколько ведро снова полное
+
+class RateLimitStore(ABC):
+    """Хранилище вёдер. Общее для воркеров хранилище (Redis и т.п.) реализует take() атомарно на своей стороне."""
+
+    @abstractmethod
+    async def take(self, key: str, limit: Limit, cost: float = 1.0) -> Decision: ...
+
+    def stats(self) -> dict:
+        return {}
+
+class MemoryRateLimitStore(RateLimitStore):
+    """Вёдра в памяти процесса: лимит действует на каждый воркер отдельно. Годится и как фейк в тестах
+    (now можно подменить)."""
+
+    def __init__(self, maxsize: int, now=time.monotonic):
+        self.maxsize = maxsize
+        self.now = now
+        # key -> (токены, время последнего пополнения); LRU, чтобы ключи по IP не росли без предела
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def take(self, key: str, limit: Limit, cost: float = 1.0) -> Decision:
+        now = self.now()
+        tokens, updated = self._buckets.pop(key, (limit.capacity, now))
+        tokens = min(limit.capacity, tokens + (now - updated) * limit.rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return Decision(
+            allowed=allowed,
+            remaining=int(tokens),
+            retry_after=0.0 if allowed else (cost - tokens) / limit.rate,
+            reset_after=(limit.capacity - tokens) / limit.rate,
+        )
+
+    def stats(self) -> dict:
+        return {"keys": len(self._buckets)}
+
+@dataclass(frozen=True, slots=True)
+class Rule:
+    name: str
+    method: str
+    path: re.Pattern
+    limit: Limit
+
+def parse_rules(limits: dict[str, str]) -> list[Rule]:
+    """{"POST /api/auth/login": "10/60", "* /api/tasks/{task_id}": "..."} -> правила по шаблонам путей."""
+    rules = []
+    for name, value in limits.items():
+        method, _, template = name.strip().partition(" ")
+        if not template:
+            method, template = "*", method
+        path_regex, _, _ = compile_path(template.strip())
+        rules.append(Rule(name, method.upper(), path_regex, Limit.parse(value)))
+    return rules
+
+rate_limit_stats = {"allowed": 0, "limited": 0}
+
+class RateLimitMiddleware:
+    """Лимит по пользователю (sub из access-токена) или по IP клиента. Первое совпавшее правило из
+    RATE_LIMITS, иначе RATE_LIMIT_DEFAULT. Ответы получают X-RateLimit-*, отказы — 429 и Retry-After."""
+
+    def __init__(self, app, *, store: RateLimitStore, rules: list[Rule], default: Limit | None):
+        self.app = app
+        self.store = store
+        self.rules = rules
+        self.default = default
+
+    def _match(self, method: str, path: str) -> tuple[str, Limit] | None:
+        for rule in self.rules:
+            if rule.method in ("*", method) and rule.path.match(path):
+                return rule.name, rule.limit
+        return ("default", self.default) if self.default else None
+
+    @staticmethod
+    def _identity(scope) -> str:
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() == "bearer" and token:
+                    try:
+                        sub = decode_access_token(token).get("sub")
+                    except Exception:
+                        sub = None
+                    if sub:
+                        return f"user:{sub}"
+                break
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
+        matched = self._match(scope["method"], scope["path"])
+        if matched is None:
+            return await self.app(scope, receive, send)
+
+        name, limit = matched
+        decision = await self.store.take(f"{name}|{self._identity(scope)}", limit)
+        headers = [
+            (b"x-ratelimit-limit", str(limit.capacity).encode()),
+            (b"x-ratelimit-remaining", str(decision.remaining).encode()),
+            (b"x-ratelimit-reset", str(math.ceil(decision.reset_after)).encode()),
+        ]
+        if not decision.allowed:
+            rate_limit_stats["limited"] += 1
+            body = json.dumps({"detail": "Too many requests"}).encode()
+            headers += [
+                (b"retry-after", str(max(1, math.ceil(decision.retry_after))).encode()),
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ]
+            await send({"type": "http.response.start", "status": 429, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+            return
+        rate_limit_stats["allowed"] += 1
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", ())) + headers
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+rate_limit_store: RateLimitStore = MemoryRateLimitStore(maxsize=settings.RATE_LIMIT_MAX_KEYS)
+
+def rate_limit_middleware_options() -> dict:
+    return {
+        "store": rate_limit_store,
+        "rules": parse_rules(settings.RATE_LIMITS),
+        "default": Limit.parse(settings.RATE_LIMIT_DEFAULT) if settings.RATE_LIMIT_DEFAULT else None,
+    }
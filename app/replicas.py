@@ -0,0 +1,135 @@
+import itertools
+import math
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from fastapi import Depends, Request
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from .config import settings
+from .database import AsyncSessionLocal, get_async_session, make_engine
+from .security import decode_access_token
+
+class Replica:
+    def __init__(self, url: str):
+        self.url = url
+        self.engine = make_engine(url)
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False, class_=AsyncSession)
+        self.down_until = 0.0
+        self.failures = 0
+
+    @property
+    def healthy(self) -> bool:
+        return self.down_until <= time.monotonic()
+
+    def eject(self) -> None:
+        self.failures += 1
+        self.down_until = time.monotonic() + settings.DB_REPLICA_RETRY_SECONDS
+
+read_replicas = [Replica(url.strip()) for url in settings.DATABASE_READ_URLS.split(",") if url.strip()]
+_next_replica = itertools.count()
+
+# Время последней записи клиента (unix-секунды) возвращается ему в cookie и в заголовке: закрепление
+# за primary не хранится в памяти процесса, поэтому его видит любой воркер и любая реплика API.
+LAST_WRITE_COOKIE = "last_write"
+LAST_WRITE_HEADER = "x-last-write"
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+def _access_claims(authorization: str | None) -> dict | None:
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        # проверенные токены в кэше: повторная проверка подписи здесь обычно не нужна
+        return decode_access_token(token)
+    except Exception:
+        return None
+
+def _recent(timestamp) -> bool:
+    return 0 <= time.time() - timestamp < settings.READ_YOUR_WRITES_SECONDS
+
+def _wants_primary(request: Request) -> bool:
+    value = request.cookies.get(LAST_WRITE_COOKIE) or request.headers.get(LAST_WRITE_HEADER)
+    try:
+        if value and _recent(float(value)):
+            return True
+    except ValueError:
+        pass
+    # токен только что выдан (signup, login, refresh — записи без метки в запросе)
+    claims = _access_claims(request.headers.get("authorization"))
+    return claims is not None and _recent(claims.get("iat", 0))
+
+def _candidates() -> list[Replica]:
+    """Здоровые реплики по кругу, начиная со следующей."""
+    start = next(_next_replica)
+    n = len(read_replicas)
+    ordered = [read_replicas[(start + i) % n] for i in range(n)]
+    return [r for r in ordered if r.healthy]
+
+@asynccontextmanager
+async def open_read_session() -> AsyncIterator[AsyncSession]:
+    """Сессия на здоровой реплике; недоступная реплика выводится из ротации, в конце — primary."""
+    for replica in _candidates():
+        session = replica.sessionmaker()
+        try:
+            await session.connection()
+        except (OSError, exc.DBAPIError, exc.TimeoutError):
+            await session.close()
+            replica.eject()
+            continue
+        try:
+            yield session
+        finally:
+            await session.close()
+        return
+    async with AsyncSessionLocal() as session:
+        yield session
+
+async def get_read_session(
+    request: Request,
+    primary: AsyncSession = Depends(get_async_session),
+) -> AsyncSession:
+    if not read_replicas or request.method not in SAFE_METHODS:
+        # изменяющий запрос читает в своей primary-сессии
+        yield primary
+        return
+    if _wants_primary(request):
+        # сразу после записи — тоже primary: реплика может ещё не догнать
+        yield primary
+        return
+    async with open_read_session() as session:
+        yield session
+
+class ReadYourWritesMiddleware:
+    """После успешного изменяющего запроса отдаёт клиенту время записи (cookie last_write и заголовок
+    X-Last-Write); пока ему меньше READ_YOUR_WRITES_SECONDS, чтения клиента идут в primary.
+    Клиент без cookie может вернуть значение заголовка в X-Last-Write сам."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            return await self.app(scope, receive, send)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                written_at = f"{time.time():.3f}".encode()
+                max_age = max(1, math.ceil(settings.READ_YOUR_WRITES_SECONDS))
+                cookie = b"%s=%s; Max-Age=%d; Path=/; HttpOnly; SameSite=Lax" % (
+                    LAST_WRITE_COOKIE.encode(), written_at, max_age
+                )
+                headers = list(message.get("headers", []))
+                headers.append((LAST_WRITE_HEADER.encode(), written_at))
+                headers.append((b"set-cookie", cookie))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+def get_replica_stats() -> list[dict]:
+    return [
+        {"url": r.engine.url.render_as_string(hide_password=True), "healthy": r.healthy, "failures": r.failures}
+        for r in read_replicas
+    ]
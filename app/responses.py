@@ -0,0 +1,10 @@
+from typing import Any
+import orjson
+from fastapi.responses import JSONResponse
+
+class ORJSONResponse(JSONResponse):
+    """JSON через orjson без прохода через Pydantic: для уже готовых dict/list.
+    OPT_UTC_Z — UTC-время с суффиксом Z, как у Pydantic."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..config import settings
+from ..database import get_async_session, get_pool_stats
+from ..jobs import job_stats, job_counts, list_dead_jobs, retry_dead_job
+from ..ratelimit import rate_limit_stats, rate_limit_store
+from ..replicas import get_replica_stats
+from ..events import broker
+from ..maintenance import refresh_token_purge_stats, task_archive_stats
+from ..deps import get_current_admin, user_cache
+from ..schemas import JobOut
+from ..security import hashing_stats, access_token_cache
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(get_current_admin)])
+
+@router.get("/stats/password-hashing", summary="Password hashing pool stats")
+async def password_hashing_stats():
+    return dict(hashing_stats)
+
+@router.get("/stats/user-cache", summary="Authenticated user cache stats")
+async def user_cache_stats():
+    return user_cache.stats()
+
+@router.get("/stats/token-cache", summary="Verified access token cache stats")
+async def token_cache_stats():
+    return access_token_cache.stats()
+
+@router.get("/stats/db-pool", summary="Database connection pool stats")
+async def db_pool_stats():
+    return get_pool_stats()
+
+@router.get("/stats/rate-limit", summary="Rate limiter counters")
+async def rate_limit_counters():
+    return dict(rate_limit_stats, **rate_limit_store.stats())
+
+@router.get("/stats/replicas", summary="Read replica health")
+async def replica_stats():
+    return get_replica_stats()
+
+@router.get("/stats/refresh-tokens", summary="Refresh token purge stats")
+async def refresh_token_stats():
+    return dict(refresh_token_purge_stats)
+
+@router.get("/stats/task-archive", summary="Task archival job stats")
+async def task_archive_counters():
+    return dict(task_archive_stats)
+
+@router.get("/stats/task-events", summary="Task change feed stats")
+async def task_events_stats():
+    return dict(broker.stats, subscribers=broker.subscriber_count())
+
+@router.get("/stats/jobs", summary="Background job queue stats")
+async def jobs_stats(session: AsyncSession = Depends(get_async_session)):
+    return dict(job_stats, workers_enabled=settings.JOBS_WORKER_ENABLED, queue=await job_counts(session))
+
+@router.get("/jobs/dead", response_model=list[JobOut], summary="Jobs that exhausted their attempts")
+async def dead_jobs(limit: int = Query(50, ge=1, le=500), session: AsyncSession = Depends(get_async_session)):
+    return await list_dead_jobs(session, limit=limit)
+
+@router.post("/jobs/{job_id}/retry", status_code=status.HTTP_204_NO_CONTENT, summary="Requeue a dead job")
+async def retry_job(job_id: int, session: AsyncSession = Depends(get_async_session)):
+    if not await retry_dead_job(session, job_id):
+        raise HTTPException(status_code=404, detail="Dead job not found")
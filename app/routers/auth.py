@@ -1,25 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import bindparam, select
 from datetime import datetime, timezone
 from ..database import get_async_session
 from ..schemas import UserCreate, UserOut, TokenPair, RefreshRequest
-from ..models import User, RefreshToken
-from ..crud.users import create_user, authenticate
-from ..security import create_access_token, create_refresh_token, decode_refresh_token
+from ..models import RefreshToken
+from ..crud.users import create_user, authenticate, get_user_by_email
+from ..crud.tokens import issue_refresh_token, revoke_user_tokens
+from ..security import create_access_token, decode_refresh_token
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
+_TOKEN_BY_JTI = select(RefreshToken).where(RefreshToken.jti == bindparam("jti"))
+
 @router.post("/signup", response_model=TokenPair, status_code=201, summary="Register a new user")
 async def signup(payload: UserCreate, session: AsyncSession = Depends(get_async_session)):
-    exists = await session.execute(select(User).where(User.email == payload.email))
-    if exists.scalar_one_or_none():
+    if await get_user_by_email(session, payload.email):
         raise HTTPException(status_code=400, detail="Email already registered")
     user = await create_user(session, email=payload.email, password=payload.password, full_name=payload.full_name)
     access = create_access_token(str(user.id))
-    refresh, jti, exp_dt = create_refresh_token(str(user.id))
-    session.add(RefreshToken(user_id=user.id, jti=jti, expires_at=exp_dt))
+    refresh = await issue_refresh_token(session, user.id)
     await session.commit()
     return TokenPair(access_token=access, refresh_token=refresh)
 
@@ -32,8 +33,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Async
         raise HTTPException(status_code=400, detail="Inactive user")
 
     access = create_access_token(str(user.id))
-    refresh, jti, exp_dt = create_refresh_token(str(user.id))
-    session.add(RefreshToken(user_id=user.id, jti=jti, expires_at=exp_dt))
+    refresh = await issue_refresh_token(session, user.id)
     await session.commit()
     return TokenPair(access_token=access, refresh_token=refresh)
 
@@ -52,7 +52,7 @@ async def refresh(payload: RefreshRequest, session: AsyncSession = Depends(get_a
     if not user_id or not jti:
         raise HTTPException(status_code=401, detail="Invalid token payload")
 
-    res = await session.execute(select(RefreshToken).where(RefreshToken.jti == jti))
+    res = await session.execute(_TOKEN_BY_JTI, {"jti": jti})
     db_token = res.scalar_one_or_none()
     if not db_token or db_token.revoked:
         raise HTTPException(status_code=401, detail="Refresh token revoked or not found")
@@ -61,8 +61,7 @@ async def refresh(payload: RefreshRequest, session: AsyncSession = Depends(get_a
 
     db_token.revoked = True
     access = create_access_token(str(user_id))
-    new_refresh, new_jti, exp_dt = create_refresh_token(str(user_id))
-    session.add(RefreshToken(user_id=user_id, jti=new_jti, expires_at=exp_dt))
+    new_refresh = await issue_refresh_token(session, user_id)
     await session.commit()
     return TokenPair(access_token=access, refresh_token=new_refresh)
 
@@ -79,8 +78,6 @@ async def logout(payload: RefreshRequest, session: AsyncSession = Depends(get_as
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token payload")
 
-    await session.execute(
-        update(RefreshToken).where(RefreshToken.user_id == user_id).values(revoked=True)
-    )
+    await revoke_user_tokens(session, user_id)
     await session.commit()
     return None
\ No newline at end of file
@@ -1,81 +1,359 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+from collections.abc import MutableMapping
+from datetime import datetime
+from typing import Literal
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from ..deps import get_current_user, get_current_admin
-from ..schemas import TaskCreate, TaskUpdate, TaskOut
-from ..models import Task, User, Role
+from ..config import settings
+from ..deps import CurrentUser, get_current_user, get_current_admin, get_stream_user
+from ..events import broker, format_sse
+from ..pagination import decode_cursor
+from ..schemas import (
+    TaskCreate,
+    TaskUpdate,
+    TaskOut,
+    TaskListParams,
+    TaskBulkCreate,
+    TaskBulkUpdate,
+    TaskBulkDelete,
+    TaskBulkItemResult,
+    TaskBulkResult,
+    TaskStatsOut,
+)
+from ..models import Task, Role
 from ..crud.tasks import (
     create_task,
     get_task,
     list_tasks_by_owner,
     list_all_tasks,
+    task_list_version,
     update_task,
     delete_task,
+    bulk_create_tasks,
+    bulk_update_tasks,
+    bulk_delete_tasks,
 )
+from ..crud.archive import restore_task
+from ..crud.stats import GLOBAL_SCOPE, user_scope, get_task_stats
 from ..database import get_async_session
+from ..replicas import get_read_session
+from ..etags import make_etag, task_etag, if_none_match, if_match_fails
+from ..export import MEDIA_TYPES, iter_task_export
+from ..responses import ORJSONResponse
+from ..search import search_tasks
 
 router = APIRouter(prefix="/api/tasks", tags=["tasks"])
 
+def task_list_params(
+    limit: int = Query(settings.TASKS_PAGE_DEFAULT_LIMIT, ge=1, le=settings.TASKS_PAGE_MAX_LIMIT),
+    cursor: str | None = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    sort: Literal["id", "updated_at"] = "id",
+    is_completed: bool | None = None,
+    created_after: datetime | None = None,
+    created_before: datetime | None = None,
+    updated_after: datetime | None = None,
+    updated_before: datetime | None = None,
+    include_archived: bool = Query(False, description="Also return completed tasks moved to the archive"),
+) -> TaskListParams:
+    if cursor:
+        try:
+            decode_cursor(cursor, sort)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return TaskListParams(
+        limit=limit,
+        cursor=cursor,
+        sort=sort,
+        is_completed=is_completed,
+        created_after=created_after,
+        created_before=created_before,
+        updated_after=updated_after,
+        updated_before=updated_before,
+        include_archived=include_archived,
+    )
+
+def _set_next_cursor(headers: MutableMapping[str, str], next_cursor: str | None) -> None:
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+
+# private: ответ зависит от токена; no-cache: браузер кэширует, но каждый раз ревалидирует по ETag
+CACHE_CONTROL = "private, no-cache"
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+def _set_etag(headers: MutableMapping[str, str], etag: str) -> None:
+    headers["ETag"] = etag
+    headers["Cache-Control"] = CACHE_CONTROL
+
+def _check_if_match(if_match: str | None, task: Task) -> datetime | None:
+    """Ранний отказ по прочитанной строке; возвращает версию, которую запись перепроверит в самом UPDATE/DELETE."""
+    if if_match_fails(if_match, task_etag(task.id, task.updated_at)):
+        raise _precondition_failed()
+    # "*" совпадает с любой текущей версией (RFC 9110 13.1.1): запись проверяет только, что задача ещё есть
+    if not if_match or if_match.strip() == "*":
+        return None
+    return task.updated_at
+
+def _precondition_failed() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Task was modified")
+
 @router.post("/", response_model=TaskOut, status_code=201)
 async def create_task_ep(
     payload: TaskCreate,
     session: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     return await create_task(
         session, title=payload.title, description=payload.description, owner_id=current_user.id
     )
 
-@router.get("/", response_model=list[TaskOut])
+# Списки отдаются как есть (dict из кортежей -> orjson), без валидации через TaskOut;
+# response_model остаётся ради OpenAPI-схемы.
+@router.get("/", response_model=list[TaskOut], response_class=ORJSONResponse)
 async def list_my_tasks(
-    session: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    params: TaskListParams = Depends(task_list_params),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: CurrentUser = Depends(get_current_user),
+    if_none_match_header: str | None = Header(None, alias="If-None-Match"),
 ):
-    return await list_tasks_by_owner(session, current_user.id)
+    # версия списка — дешёвый агрегат по индексу; при совпадении страницу не читаем вовсе
+    max_updated_at, count = await task_list_version(
+        session, current_user.id, include_archived=params.include_archived
+    )
+    etag = make_etag("tasks", current_user.id, max_updated_at, count, request.url.query)
+    if if_none_match(if_none_match_header, etag):
+        return _not_modified(etag)
+    tasks, next_cursor = await list_tasks_by_owner(session, current_user.id, params)
+    headers: dict[str, str] = {}
+    _set_next_cursor(headers, next_cursor)
+    _set_etag(headers, etag)
+    return ORJSONResponse(tasks, headers=headers)
 
-@router.get("/all", response_model=list[TaskOut])
+@router.get("/all", response_model=list[TaskOut], response_class=ORJSONResponse)
 async def list_everything(
+    params: TaskListParams = Depends(task_list_params),
+    session: AsyncSession = Depends(get_read_session),
+    admin: CurrentUser = Depends(get_current_admin),
+):
+    tasks, next_cursor = await list_all_tasks(session, params)
+    headers: dict[str, str] = {}
+    _set_next_cursor(headers, next_cursor)
+    return ORJSONResponse(tasks, headers=headers)
+
+_stats_days = Query(settings.TASK_STATS_DEFAULT_DAYS, ge=1, le=settings.TASK_STATS_MAX_DAYS)
+
+@router.get("/stats", response_model=TaskStatsOut, summary="Task counts for the current user")
+async def my_task_stats(
+    days: int = _stats_days,
+    session: AsyncSession = Depends(get_read_session),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    return await get_task_stats(session, user_scope(current_user.id), days=days)
+
+@router.get("/stats/all", response_model=TaskStatsOut, summary="Task counts across all users or for one user")
+async def all_task_stats(
+    days: int = _stats_days,
+    owner_id: int | None = None,
+    session: AsyncSession = Depends(get_read_session),
+    admin: CurrentUser = Depends(get_current_admin),
+):
+    scope = GLOBAL_SCOPE if owner_id is None else user_scope(owner_id)
+    return await get_task_stats(session, scope, days=days)
+
+def _owner_scope(user: CurrentUser) -> int | None:
+    return None if user.role == Role.admin else user.id
+
+@router.post("/bulk", response_model=TaskBulkResult, status_code=201, summary="Create many tasks in one transaction")
+async def bulk_create_ep(
+    payload: TaskBulkCreate,
     session: AsyncSession = Depends(get_async_session),
-    admin: User = Depends(get_current_admin),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    return await list_all_tasks(session)
+    tasks = await bulk_create_tasks(session, payload.items, owner_id=current_user.id)
+    return TaskBulkResult(
+        results=[
+            TaskBulkItemResult(index=i, id=task.id, status="created", task=TaskOut.model_validate(task))
+            for i, task in enumerate(tasks)
+        ]
+    )
+
+@router.patch("/bulk", response_model=TaskBulkResult, summary="Update many tasks in one transaction")
+async def bulk_update_ep(
+    payload: TaskBulkUpdate,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    updated = await bulk_update_tasks(session, payload.items, owner_id=_owner_scope(current_user))
+    results = []
+    for i, item in enumerate(payload.items):
+        task = updated.get(item.id)
+        if task is None:
+            results.append(TaskBulkItemResult(index=i, id=item.id, status="not_found"))
+        else:
+            results.append(TaskBulkItemResult(index=i, id=item.id, status="updated", task=TaskOut.model_validate(task)))
+    return TaskBulkResult(results=results)
+
+@router.delete("/bulk", response_model=TaskBulkResult, summary="Delete many tasks in one transaction")
+async def bulk_delete_ep(
+    payload: TaskBulkDelete,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    deleted = await bulk_delete_tasks(session, payload.ids, owner_id=_owner_scope(current_user))
+    return TaskBulkResult(
+        results=[
+            TaskBulkItemResult(index=i, id=task_id, status="deleted" if task_id in deleted else "not_found")
+            for i, task_id in enumerate(payload.ids)
+        ]
+    )
+
+@router.get("/search", response_model=list[TaskOut], summary="Full-text search over title and description")
+async def search_tasks_ep(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(settings.TASKS_PAGE_DEFAULT_LIMIT, ge=1, le=settings.TASKS_PAGE_MAX_LIMIT),
+    offset: int = Query(0, ge=0, le=settings.SEARCH_MAX_OFFSET),
+    all_owners: bool = Query(False, description="Admins only: search every user's tasks"),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    if all_owners and current_user.role != Role.admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required")
+    tasks = await search_tasks(
+        session, q, owner_id=None if all_owners else current_user.id, limit=limit + 1, offset=offset
+    )
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        response.headers["X-Next-Offset"] = str(offset + limit)
+    return tasks
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    summary="Stream all tasks as NDJSON or CSV",
+    responses={200: {"content": {"application/x-ndjson": {}, "text/csv": {}}}},
+)
+async def export_tasks(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    is_completed: bool | None = None,
+    updated_after: datetime | None = None,
+    include_archived: bool = Query(False, description="Also export completed tasks moved to the archive"),
+    admin: CurrentUser = Depends(get_current_admin),
+):
+    return StreamingResponse(
+        iter_task_export(format, is_completed=is_completed, updated_after=updated_after, include_archived=include_archived),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="tasks.{format}"'},
+    )
+
+@router.get(
+    "/events",
+    response_class=StreamingResponse,
+    summary="Server-Sent Events stream of the current user's task changes",
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def task_events(
+    last_event_id: int | None = Query(None, description="Resume after this event id"),
+    last_event_id_header: int | None = Header(None, alias="Last-Event-ID"),
+    current_user: CurrentUser = Depends(get_stream_user),
+):
+    resume_from = last_event_id_header if last_event_id_header is not None else last_event_id
+
+    async def stream():
+        async with broker.subscribe(current_user.id, resume_from) as sub:
+            yield b"retry: 3000\n\n"
+            while True:
+                try:
+                    evt = await asyncio.wait_for(sub.get(), timeout=settings.EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                yield format_sse(evt)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @router.get("/{task_id}", response_model=TaskOut)
 async def get_task_ep(
     task_id: int,
-    session: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user),
+    response: Response,
+    session: AsyncSession = Depends(get_read_session),
+    current_user: CurrentUser = Depends(get_current_user),
+    if_none_match_header: str | None = Header(None, alias="If-None-Match"),
 ):
     task = await get_task(session, task_id)
     if not task or (task.owner_id != current_user.id and current_user.role != Role.admin):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    etag = task_etag(task.id, task.updated_at)
+    if if_none_match(if_none_match_header, etag):
+        return _not_modified(etag)
+    _set_etag(response.headers, etag)
     return task
 
 @router.patch("/{task_id}", response_model=TaskOut)
 async def update_task_ep(
     task_id: int,
     payload: TaskUpdate,
+    response: Response,
     session: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
+    if_match: str | None = Header(None, alias="If-Match"),
 ):
     task = await get_task(session, task_id)
     if not task or (task.owner_id != current_user.id and current_user.role != Role.admin):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
-    return await update_task(
+    expected = _check_if_match(if_match, task)
+    task = await update_task(
         session,
         task,
         title=payload.title,
         description=payload.description,
         is_completed=payload.is_completed,
+        expected_updated_at=expected,
     )
+    if task is None:
+        if expected is not None:
+            raise _precondition_failed()
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    _set_etag(response.headers, task_etag(task.id, task.updated_at))
+    return task
 
 @router.delete("/{task_id}", status_code=204)
 async def delete_task_ep(
     task_id: int,
     session: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
+    if_match: str | None = Header(None, alias="If-Match"),
 ):
     task = await get_task(session, task_id)
     if not task or (task.owner_id != current_user.id and current_user.role != Role.admin):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
-    await delete_task(session, task)
-    return None
\ No newline at end of file
+    expected = _check_if_match(if_match, task)
+    if not await delete_task(session, task, expected_updated_at=expected):
+        if expected is not None:
+            raise _precondition_failed()
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    return None
+
+@router.post("/{task_id}/restore", response_model=TaskOut, summary="Restore a deleted or archived task")
+async def restore_task_ep(
+    task_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    try:
+        task = await restore_task(session, task_id, owner_id=_owner_scope(current_user))
+    except IntegrityError:
+        # id уже занят: старая SQLite-база без AUTOINCREMENT могла выдать его новой задаче
+        await session.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Task id is already in use")
+    if task is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Archived task not found")
+    return task
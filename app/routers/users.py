@@ -1,21 +1,28 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from ..deps import get_current_user, get_current_admin
+from ..deps import CurrentUser, get_current_user, get_current_admin
 from ..schemas import UserOut
 from ..models import User
-from ..database import get_async_session
+from ..replicas import get_read_session
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
 @router.get("/me", response_model=UserOut)
-async def read_me(current_user: User = Depends(get_current_user)):
-    return current_user
+async def read_me(
+    session: AsyncSession = Depends(get_read_session),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    # в принципале только поля для авторизации, профиль читаем целиком
+    user = await session.get(User, current_user.id)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User inactive or not found")
+    return user
 
 @router.get("/", response_model=list[UserOut])
 async def list_users(
-    session: AsyncSession = Depends(get_async_session),
-    admin: User = Depends(get_current_admin),
+    session: AsyncSession = Depends(get_read_session),
+    admin: CurrentUser = Depends(get_current_admin),
 ):
     res = await session.execute(select(User).order_by(User.id))
     return list(res.scalars().all())
\ No newline at end of file
@@ -1,7 +1,8 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
-from datetime import datetime
+from typing import Optional, Literal
+from datetime import date, datetime
 from enum import Enum
+from .config import settings
 
 class Role(str, Enum):
     user = "user"
@@ -58,6 +59,66 @@ class TaskOut(TaskBase):
     owner_id: int
     created_at: datetime
     updated_at: datetime
+    # не None только в списках с include_archived
+    archived_at: Optional[datetime] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class TaskListParams(BaseModel):
+    limit: int
+    cursor: Optional[str] = None
+    sort: Literal["id", "updated_at"] = "id"
+    is_completed: Optional[bool] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    updated_after: Optional[datetime] = None
+    updated_before: Optional[datetime] = None
+    include_archived: bool = False
+
+# Bulk
+class TaskBulkCreate(BaseModel):
+    items: list[TaskCreate] = Field(min_length=1, max_length=settings.TASKS_BULK_MAX_ITEMS)
+
+class TaskBulkUpdateItem(TaskUpdate):
+    id: int
+
+class TaskBulkUpdate(BaseModel):
+    items: list[TaskBulkUpdateItem] = Field(min_length=1, max_length=settings.TASKS_BULK_MAX_ITEMS)
+
+class TaskBulkDelete(BaseModel):
+    ids: list[int] = Field(min_length=1, max_length=settings.TASKS_BULK_MAX_ITEMS)
+
+class TaskBulkItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    status: Literal["created", "updated", "deleted", "not_found"]
+    task: Optional[TaskOut] = None
+
+class TaskBulkResult(BaseModel):
+    results: list[TaskBulkItemResult]
+
+# Jobs
+class JobOut(BaseModel):
+    id: int
+    kind: str
+    payload: dict
+    status: str
+    attempts: int
+    max_attempts: int
+    run_at: datetime
+    last_error: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class TaskDailyCountOut(BaseModel):
+    day: date
+    created: int
+
+class TaskStatsOut(BaseModel):
+    total: int
+    completed: int
+    open: int
+    created_per_day: list[TaskDailyCountOut]
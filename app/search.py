@@ -0,0 +1,102 @@
+import re
+from sqlalchemy import column, func, literal_column, or_, select, table, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from .database import engine
+from .models import Task
+
+# Полнотекстовый индекс по title/description.
+# Postgres: GIN по выражению to_tsvector — синхронизируется самим Postgres.
+# SQLite: внешняя FTS5-таблица tasks_fts, синхронизируется триггерами (в т.ч. для bulk-операций).
+
+# выражение в запросе должно совпадать с индексным, поэтому литералы, а не bind-параметры
+PG_TSVECTOR = "to_tsvector('simple', coalesce({t}title, '') || ' ' || coalesce({t}description, ''))"
+
+PG_DDL = [f"CREATE INDEX IF NOT EXISTS ix_tasks_fts ON tasks USING GIN ({PG_TSVECTOR.format(t='')})"]
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+    "title, description, content='tasks', content_rowid='id', tokenize='unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+]
+
+tasks_fts = table("tasks_fts", column("rowid"))
+
+# объекты индекса по диалектам — для проверки схемы (SCHEMA_INIT_MODE=check, check-db)
+PG_OBJECTS = {"ix_tasks_fts": "index"}
+SQLITE_OBJECTS = {"tasks_fts": "table", "tasks_fts_ai": "trigger", "tasks_fts_ad": "trigger", "tasks_fts_au": "trigger"}
+
+def missing_search_index(sync_conn) -> list[str]:
+    """Объекты полнотекстового индекса, которых нет в базе (пусто для прочих СУБД)."""
+    dialect = sync_conn.dialect.name
+    if dialect == "postgresql":
+        expected = PG_OBJECTS
+        res = sync_conn.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = 'tasks'"))
+    elif dialect == "sqlite":
+        expected = SQLITE_OBJECTS
+        res = sync_conn.execute(text("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"))
+    else:
+        return []
+    existing = set(res.scalars())
+    return [name for name in expected if name not in existing]
+
+async def install_search_index(conn: AsyncConnection) -> None:
+    """Идемпотентно создаёт индекс; в SQLite при первом создании индексирует уже существующие задачи."""
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        for ddl in PG_DDL:
+            await conn.execute(text(ddl))
+    elif dialect == "sqlite":
+        exists = await conn.scalar(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'"))
+        for ddl in SQLITE_DDL:
+            await conn.execute(text(ddl))
+        if not exists:
+            await conn.execute(text("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')"))
+
+async def init_search_index() -> None:
+    async with engine.begin() as conn:
+        await install_search_index(conn)
+
+def _fts5_query(q: str) -> str:
+    # каждое слово — отдельная фраза в кавычках (без синтаксиса FTS5 от пользователя), последнее — префиксом
+    words = re.findall(r"\w+", q)
+    if not words:
+        return ""
+    parts = ['"' + w.replace('"', '""') + '"' for w in words]
+    parts[-1] += "*"
+    return " ".join(parts)
+
+async def search_tasks(
+    session: AsyncSession, q: str, *, owner_id: int | None, limit: int, offset: int
+) -> list[Task]:
+    """Задачи по релевантности; owner_id=None — по всем владельцам."""
+    dialect = session.bind.dialect.name
+    if dialect == "postgresql":
+        vector = literal_column(PG_TSVECTOR.format(t="tasks."))
+        query = func.websearch_to_tsquery(literal_column("'simple'"), q)
+        rank = func.ts_rank(vector, query)
+        stmt = select(Task).where(vector.op("@@")(query)).order_by(rank.desc(), Task.id)
+    elif dialect == "sqlite":
+        match = _fts5_query(q)
+        if not match:
+            return []
+        fts = literal_column("tasks_fts")
+        stmt = (
+            select(Task)
+            .join(tasks_fts, tasks_fts.c.rowid == Task.id)
+            .where(fts.op("MATCH")(match))
+            .order_by(func.bm25(fts), Task.id)
+        )
+    else:
+        # без индекса: только для разработки на других СУБД
+        pattern = f"%{q}%"
+        stmt = select(Task).where(or_(Task.title.ilike(pattern), Task.description.ilike(pattern))).order_by(Task.id)
+    if owner_id is not None:
+        stmt = stmt.where(Task.owner_id == owner_id)
+    res = await session.execute(stmt.limit(limit).offset(offset))
+    return list(res.scalars().all())
@@ -1,24 +1,111 @@
+import asyncio
+import hashlib
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from functools import cache
 from typing import Any
-from jose import jwt
-from passlib.context import CryptContext
 from uuid import uuid4
+from .cache import TTLCache
 from .config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# python-jose тянет cryptography (~50 мс импорта): грузим при первом токене, а не при старте воркера
+def _jwt_encode(claims: dict[str, Any], secret: str) -> str:
+    from jose import jwt
+
+    return jwt.encode(claims, secret, algorithm=settings.JWT_ALGORITHM)
+
+def _jwt_decode(token: str, secret: str) -> dict[str, Any]:
+    from jose import jwt
+
+    return jwt.decode(token, secret, algorithms=[settings.JWT_ALGORITHM])
+
+@cache
+def pwd_context():
+    """CryptContext создаётся при первом хэшировании (импорт passlib — тоже)."""
+    from passlib.context import CryptContext
+
+    # min/max = rounds: хэши с другой стоимостью считаются устаревшими и перехэшируются при логине
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+    )
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return pwd_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return pwd_context().verify(plain_password, hashed_password)
+
+def _verify_and_update(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return pwd_context().verify_and_update(plain_password, hashed_password)
+
+_hash_executor: Executor | None = None
+_hash_slots = asyncio.Semaphore(settings.PASSWORD_HASH_MAX_CONCURRENCY)
+hashing_stats = {
+    "waiting": 0,
+    "in_flight": 0,
+    "completed": 0,
+    "rehashed": 0,
+    "wait_seconds_total": 0.0,
+    "run_seconds_total": 0.0,
+}
+
+def _get_hash_executor() -> Executor:
+    global _hash_executor
+    if _hash_executor is None:
+        if settings.PASSWORD_HASH_EXECUTOR == "process":
+            _hash_executor = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+        else:
+            _hash_executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="pwd-hash"
+            )
+    return _hash_executor
+
+def shutdown_hash_executor() -> None:
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+
+async def _run_hashing(fn, *args):
+    queued_at = time.perf_counter()
+    hashing_stats["waiting"] += 1
+    try:
+        await _hash_slots.acquire()
+    finally:
+        hashing_stats["waiting"] -= 1
+    started_at = time.perf_counter()
+    hashing_stats["wait_seconds_total"] += started_at - queued_at
+    hashing_stats["in_flight"] += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_hash_executor(), fn, *args)
+    finally:
+        _hash_slots.release()
+        hashing_stats["in_flight"] -= 1
+        hashing_stats["completed"] += 1
+        hashing_stats["run_seconds_total"] += time.perf_counter() - started_at
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_hashing(get_password_hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Проверка пароля в пуле; второй элемент — новый хэш, если текущий пора обновить."""
+    ok, new_hash = await _run_hashing(_verify_and_update, plain_password, hashed_password)
+    if new_hash is not None:
+        hashing_stats["rehashed"] += 1
+    return ok, new_hash
 
 def _create_token(subject: str, *, token_type: str, expires_delta: timedelta, secret: str) -> tuple[str, str]:
     now = datetime.now(timezone.utc)
     expire = now + expires_delta
     jti = uuid4().hex
     to_encode = {"sub": subject, "type": token_type, "exp": int(expire.timestamp()), "iat": int(now.timestamp()), "jti": jti}
-    encoded_jwt = jwt.encode(to_encode, secret, algorithm=settings.JWT_ALGORITHM)
+    encoded_jwt = _jwt_encode(to_encode, secret)
     return encoded_jwt, jti
 
 def create_access_token(subject: str) -> str:
@@ -41,8 +128,19 @@ def create_refresh_token(subject: str) -> tuple[str, str, datetime]:
     exp_dt = datetime.now(timezone.utc) + expires
     return token, jti, exp_dt
 
+# Проверенные claims по sha256 токена, запись живёт не дольше exp
+access_token_cache = TTLCache(
+    maxsize=settings.JWT_DECODE_CACHE_SIZE,
+    ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
+
 def decode_access_token(token: str) -> dict[str, Any]:
-    return jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+    key = hashlib.sha256(token.encode()).digest()
+    claims = access_token_cache.get(key)
+    if claims is None:
+        claims = _jwt_decode(token, settings.JWT_SECRET_KEY)
+        access_token_cache.set(key, claims, ttl=claims.get("exp", 0) - time.time())
+    return dict(claims)
 
 def decode_refresh_token(token: str) -> dict[str, Any]:
-    return jwt.decode(token, settings.JWT_REFRESH_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
\ No newline at end of file
+    return _jwt_decode(token, settings.JWT_REFRESH_SECRET_KEY)
\ No newline at end of file
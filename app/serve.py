@@ -0,0 +1,65 @@
+"""Продакшн-запуск: несколько воркеров uvicorn (uvloop + httptools), настройки из Settings.
+
+    python -m app.serve
+"""
+import asyncio
+import importlib.util
+import logging
+import os
+import uvicorn
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+MEMORY_BROKER_USER_CACHE_TTL = 5.0
+
+def default_workers() -> int:
+    # учитываем cpuset/affinity контейнера, а не все ядра хоста
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+async def _prepare_schema_once() -> None:
+    from .database import engine, init_models
+    from .search import init_search_index
+
+    await init_models()
+    await init_search_index()
+    await engine.dispose()
+
+def main() -> None:
+    workers = settings.SERVER_WORKERS or default_workers()
+    if workers > 1 and settings.SCHEMA_INIT_MODE == "create":
+        # create_all из N воркеров одновременно гоняется за одни и те же CREATE TABLE:
+        # готовим схему один раз здесь, воркеры (spawn, читают env заново) только проверяют её
+        asyncio.run(_prepare_schema_once())
+        os.environ["SCHEMA_INIT_MODE"] = "check"
+    if workers > 1 and settings.EVENTS_BACKEND == "memory":
+        logger.warning(
+            "EVENTS_BACKEND=memory with %d workers: /api/tasks/events sees only its own worker's writes"
+            " and user changes reach other workers' caches only after USER_CACHE_TTL_SECONDS; use EVENTS_BACKEND=postgres",
+            workers,
+        )
+        # изменения пользователя не доходят до других воркеров: без явной настройки держим кэш коротким
+        if "USER_CACHE_TTL_SECONDS" not in settings.model_fields_set:
+            os.environ["USER_CACHE_TTL_SECONDS"] = str(min(settings.USER_CACHE_TTL_SECONDS, MEMORY_BROKER_USER_CACHE_TTL))
+    has_uvloop = importlib.util.find_spec("uvloop") is not None
+    has_httptools = importlib.util.find_spec("httptools") is not None
+    uvicorn.run(
+        "app.main:app",
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        workers=workers,
+        loop="uvloop" if has_uvloop else "asyncio",
+        http="httptools" if has_httptools else "h11",
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE_SECONDS,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_SHUTDOWN_SECONDS,
+        proxy_headers=settings.SERVER_PROXY_HEADERS,
+        forwarded_allow_ips=settings.SERVER_FORWARDED_ALLOW_IPS,
+        access_log=settings.SERVER_ACCESS_LOG,
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Фазы старта воркера в секундах; отсчёт — с начала импорта app.main
+started_at = time.perf_counter()
+startup_stats: dict[str, float] = {}
+
+@contextmanager
+def startup_phase(name: str):
+    begin = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_stats[f"{name}_seconds"] = round(time.perf_counter() - begin, 6)
+
+def mark_ready() -> None:
+    startup_stats["ready_seconds"] = round(time.perf_counter() - started_at, 6)
+    logger.info("startup: %s", ", ".join(f"{k}={v * 1000:.1f}ms" for k, v in startup_stats.items()))
@@ -0,0 +1,156 @@
+"""Масштабирование RPS по числу воркеров python -m app.serve.
+
+Для каждого числа воркеров поднимает сервер на засеянной базе и гоняет
+GET /api/tasks/ (JWT, запрос к базе, сериализация) из нескольких
+процессов-генераторов нагрузки. Эффективность = rps(N) / (N * rps(1)).
+Генераторы нагрузки тоже едят CPU: на машине с K ядрами честные цифры
+получаются для N <= K - --clients.
+
+    python -m benchmarks.bench_scaling --workers 1,2,4 --duration 10 --output scaling.json
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default=None, help="comma-separated worker counts (default: 1,2,4,... up to CPUs)")
+    parser.add_argument("--database-url", default=None, help="default: temporary SQLite file (data is deleted)")
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--tasks-per-user", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=50, help="page size of the listed tasks")
+    parser.add_argument("--clients", type=int, default=2, help="load generator processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="connections per load generator")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per worker count")
+    parser.add_argument("--output", default=None)
+    return parser.parse_args(argv)
+
+def _default_worker_counts() -> list[int]:
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    counts, n = [], 1
+    while n < cpus:
+        counts.append(n)
+        n *= 2
+    return counts + [cpus]
+
+def _server_env(args: argparse.Namespace, workers: int) -> dict:
+    return dict(
+        os.environ,
+        DATABASE_URL=args.database_url,
+        DEBUG="false",
+        SERVER_HOST="127.0.0.1",
+        SERVER_PORT=str(args.port),
+        SERVER_WORKERS=str(workers),
+        SCHEMA_INIT_MODE="check",
+        RATE_LIMIT_ENABLED="false",
+        SLOW_REQUEST_THRESHOLD_MS="0",
+        REFRESH_TOKEN_PURGE_INTERVAL_SECONDS="0",
+    )
+
+def _wait_ready(base_url: str, timeout: float = 60.0) -> None:
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(base_url + "/", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("server did not become ready")
+
+async def _load(base_url: str, tokens: list[str], limit: int, concurrency: int, duration: float) -> tuple[int, int, float]:
+    """(запросов, ошибок, секунд) — время своё у каждого генератора, без старта процесса."""
+    import httpx
+
+    done = errors = 0
+    started = time.monotonic()
+    deadline = started + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+
+        async def worker(n: int):
+            nonlocal done, errors
+            headers = {"Authorization": f"Bearer {tokens[n % len(tokens)]}"}
+            while time.monotonic() < deadline:
+                res = await client.get("/api/tasks/", params={"limit": limit}, headers=headers)
+                done += 1
+                if res.status_code != 200:
+                    errors += 1
+
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return done, errors, time.monotonic() - started
+
+def _load_process(base_url, tokens, limit, concurrency, duration, out) -> None:
+    out.put(asyncio.run(_load(base_url, tokens, limit, concurrency, duration)))
+
+def measure(args: argparse.Namespace, tokens: list[str], workers: int) -> dict:
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.serve"], env=_server_env(args, workers), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        _wait_ready(base_url)
+        # прогрев: ленивые импорты, пул соединений, кэши токенов во всех воркерах
+        asyncio.run(_load(base_url, tokens, args.limit, args.concurrency, 1.0))
+        ctx = multiprocessing.get_context("spawn")
+        out = ctx.Queue()
+        procs = [
+            ctx.Process(target=_load_process, args=(base_url, tokens, args.limit, args.concurrency, args.duration, out))
+            for _ in range(args.clients)
+        ]
+        for p in procs:
+            p.start()
+        results = [out.get() for _ in procs]
+        for p in procs:
+            p.join()
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+    return {
+        "workers": workers,
+        "requests": sum(done for done, _, _ in results),
+        "errors": sum(errors for _, errors, _ in results),
+        "rps": round(sum(done / elapsed for done, _, elapsed in results), 1),
+    }
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    if args.database_url is None:
+        args.database_url = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-'), 'bench.db')}"
+    # Settings читаются при импорте app, поэтому окружение настраиваем до него
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["DEBUG"] = "false"
+
+    from app.security import create_access_token
+    from benchmarks.bench_api import seed
+
+    state = asyncio.run(seed(args.users, args.tasks_per_user))
+    tokens = [create_access_token(str(uid)) for uid in state["user_ids"]]
+    counts = [int(n) for n in args.workers.split(",")] if args.workers else _default_worker_counts()
+
+    rows = []
+    for workers in counts:
+        row = measure(args, tokens, workers)
+        rows.append(row)
+        base = rows[0]["rps"] / rows[0]["workers"]
+        row["efficiency"] = round(row["rps"] / (workers * base), 3) if base else None
+        print(
+            f"workers={workers:3d}  rps={row['rps']:9.1f}  efficiency={row['efficiency']}  errors={row['errors']}",
+            flush=True,
+        )
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump({"cpus": _default_worker_counts()[-1], "results": rows}, fh, indent=2)
+        print(f"results written to {args.output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
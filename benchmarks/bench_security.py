@@ -0,0 +1,67 @@
+"""Микробенчмарки app/security.py: JWT encode/decode и bcrypt.
+
+    python -m benchmarks.bench_security [--iterations N] [--bcrypt-iterations N] [--json]
+"""
+import argparse
+import json
+import time
+
+from app.config import settings
+from app.security import (
+    _jwt_decode,
+    access_token_cache,
+    create_access_token,
+    decode_access_token,
+    get_password_hash,
+    verify_password,
+)
+
+def _per_op_us(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+def bench_tokens(iterations: int) -> dict[str, float]:
+    token = create_access_token("1")
+    results = {
+        "encode_access_token": _per_op_us(lambda: create_access_token("1"), iterations),
+        "decode_uncached": _per_op_us(lambda: _jwt_decode(token, settings.JWT_SECRET_KEY), iterations),
+    }
+    access_token_cache.clear()
+    decode_access_token(token)
+    results["decode_access_token[cached]"] = _per_op_us(lambda: decode_access_token(token), iterations)
+    return results
+
+def bench_bcrypt(iterations: int) -> dict[str, float]:
+    hashed = get_password_hash("benchmark-password")
+    return {
+        f"bcrypt_hash[rounds={settings.BCRYPT_ROUNDS}]": _per_op_us(
+            lambda: get_password_hash("benchmark-password"), iterations
+        ),
+        f"bcrypt_verify[rounds={settings.BCRYPT_ROUNDS}]": _per_op_us(
+            lambda: verify_password("benchmark-password", hashed), iterations
+        ),
+    }
+
+def run(iterations: int, bcrypt_iterations: int) -> dict[str, float]:
+    results = bench_tokens(iterations)
+    if bcrypt_iterations > 0:
+        results.update(bench_bcrypt(bcrypt_iterations))
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--bcrypt-iterations", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print results as JSON (us/op)")
+    args = parser.parse_args()
+    results = run(args.iterations, args.bcrypt_iterations)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, us in results.items():
+        print(f"{name:40s} {us:12.2f} us/op")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Сериализация страницы задач: ORM + TaskOut + json против кортежей колонок + orjson.
+
+Меряет только путь «строки -> JSON-байты», без SQL: оба варианта получают
+уже прочитанные данные, как их отдаёт драйвер.
+
+    python -m benchmarks.bench_serialization [--rows N] [--repeat N] [--json]
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.crud.tasks import TASK_OUT_FIELDS
+from app.models import Task
+from app.responses import ORJSONResponse
+from app.schemas import TaskOut
+
+def _rows(n: int) -> list[tuple]:
+    now = datetime.now(timezone.utc)
+    return [(i, f"task {i}", "benchmark task " * 4, i % 3 == 0, 1, now, now) for i in range(1, n + 1)]
+
+def _rows_per_sec(fn, rows: int, repeat: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return rows * repeat / (time.perf_counter() - start)
+
+def run(rows: int, repeat: int) -> dict[str, float]:
+    data = _rows(rows)
+    adapter = TypeAdapter(list[TaskOut])
+
+    def orm_pydantic() -> bytes:
+        # то, что делал FastAPI раньше: ORM-объекты -> TaskOut(from_attributes) -> jsonable -> json
+        tasks = [Task(**dict(zip(TASK_OUT_FIELDS, row))) for row in data]
+        validated = adapter.validate_python(tasks, from_attributes=True)
+        return json.dumps(jsonable_encoder(validated)).encode()
+
+    def columns_orjson() -> bytes:
+        return ORJSONResponse([dict(zip(TASK_OUT_FIELDS, row)) for row in data]).body
+
+    results = {
+        "orm_pydantic_rows_per_sec": round(_rows_per_sec(orm_pydantic, rows, repeat)),
+        "columns_orjson_rows_per_sec": round(_rows_per_sec(columns_orjson, rows, repeat)),
+    }
+    results["speedup"] = round(results["columns_orjson_rows_per_sec"] / results["orm_pydantic_rows_per_sec"], 2)
+    return results
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+    results = run(args.rows, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, value in results.items():
+            print(f"{name:30s} {value}")
+
+if __name__ == "__main__":
+    main()
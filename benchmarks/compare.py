@@ -0,0 +1,34 @@
+"""Сравнение двух JSON-отчётов benchmarks.bench_api.
+
+    python -m benchmarks.compare before.json after.json
+"""
+import json
+import sys
+
+def _delta(old, new) -> str:
+    if not old or new is None:
+        return "   n/a"
+    return f"{(new - old) / old * 100:+6.1f}%"
+
+def main(argv=None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        raise SystemExit(__doc__)
+    with open(argv[0]) as fh:
+        before = json.load(fh)
+    with open(argv[1]) as fh:
+        after = json.load(fh)
+    print(f"before: {before['meta'].get('commit')}  after: {after['meta'].get('commit')}")
+    print(f"{'scenario':12s} {'rps':>22s} {'p99_ms':>22s} {'q/req':>12s}")
+    for name, new in after["scenarios"].items():
+        old = before["scenarios"].get(name)
+        if old is None:
+            continue
+        print(
+            f"{name:12s} {old['rps']:8.1f} -> {new['rps']:8.1f} {_delta(old['rps'], new['rps'])}"
+            f" {old['p99_ms']:8.2f} -> {new['p99_ms']:8.2f} {_delta(old['p99_ms'], new['p99_ms'])}"
+            f" {old['db_queries_per_request']} -> {new['db_queries_per_request']}"
+        )
+
+if __name__ == "__main__":
+    main()